@@ -1,79 +1,227 @@
 #!/usr/bin/env python3
 import csv
+import gzip
+import os
+import shutil
+import struct
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from scapy.all import PcapReader, UDP
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # numba is optional: without it the record offset scan runs in CPython
+    HAVE_NUMBA = False
+    def njit(*args, **kwargs):
+        return lambda f: f
 
 NAV_CSV = Path("out/nav_metrics.csv")
 SUMMARY_CSV = Path("out/summary.csv")
-IAT_UP = Path("out/iat_up.csv")
-IAT_DOWN = Path("out/iat_down.csv")
+IAT_UP = Path("out/iat_up.csv.gz")
+IAT_DOWN = Path("out/iat_down.csv.gz")
+
+# Classic libpcap format: magic -> nanoseconds per timestamp tick (usec / nsec captures)
+PCAP_MAGIC = {0xa1b2c3d4: 1000, 0xa1b23c4d: 1}
+PCAP_HDR_LEN = 24
+REC_HDR_LEN = 16
+LINKTYPE_ETHERNET = 1
+ETH_HDR_LEN = 14
+IPV6_HDR_LEN = 40
+PCAP_REC_DTYPE = np.dtype([("ts_sec", "u4"), ("ts_frac", "u4"), ("incl_len", "u4"), ("orig_len", "u4")])
+SUMMARY_COLUMNS = ["url", "level", "dropper", "rep", "pcap", "plt_ms",
+                   "bytes_up", "bytes_down", "pkt_up", "pkt_down", "duration_s"]
+IAT_COLUMNS = ["url", "level", "dropper", "rep", "iat_s"]
+TSHARK_FIELDS = ("frame.time_epoch", "udp.srcport", "udp.dstport", "frame.len")
+# frame.time_epoch is read as text: a float64 epoch only resolves ~0.24 us
+TSHARK_DTYPE = np.dtype([("ts", "U32"), ("sport", "u2"), ("dport", "u2"), ("plen", "u4")])
+# Timestamps are int64 nanoseconds; IATs are written with 6 digits when they are all whole
+# microseconds (tcpdump pcaps), with 9 otherwise (eBPF / socket capture)
+IAT_FORMAT_US, IAT_FORMAT_NS = "%.6f", "%.9f"
+CSV_BUFFERING = 1 << 20  # 1 MiB output buffers, the IAT files run to millions of rows
+IAT_GZIP_LEVEL = 1  # fastest level, still ~9x smaller than plain text
 
 def load_runs():
     with open(NAV_CSV) as f:
         return list(csv.DictReader(f))
 
-def analyse_pcap(pcap_path: str):
-    first_ts = last_ts = None
-    bytes_up = bytes_down = 0
-    pkt_up = pkt_down = 0
-    last_ts_up = last_ts_down = None
-    iats_up, iats_down = [], []
-
-    with PcapReader(pcap_path) as pcap:
-        for pkt in pcap:
-            if not pkt.haslayer(UDP):
-                continue
-            udp = pkt[UDP]
-            ts = float(pkt.time)
-            sport, dport = int(udp.sport), int(udp.dport)
-
-            if dport == 443:  # client -> server
-                pkt_up += 1; bytes_up += len(bytes(pkt))
-                if last_ts_up is not None: iats_up.append(ts - last_ts_up)
-                last_ts_up = ts
-            elif sport == 443:  # server -> client
-                pkt_down += 1; bytes_down += len(bytes(pkt))
-                if last_ts_down is not None: iats_down.append(ts - last_ts_down)
-                last_ts_down = ts
-            else:
-                continue
-
-            if first_ts is None: first_ts = ts
-            last_ts = ts
-
-    duration = (last_ts - first_ts) if (first_ts and last_ts) else 0.0
+def pcap_header(mm):
+    """Validate the pcap global header, return (byte order, nanoseconds per ts tick)."""
+    for endian in "<>":
+        magic, = struct.unpack_from(endian + "I", mm, 0)
+        if magic in PCAP_MAGIC:
+            break
+    else:
+        raise ValueError(f"unsupported capture format (magic {magic:#010x}), expected classic pcap")
+    _, _, _, _, _, linktype = struct.unpack_from(endian + "HHiIII", mm, 4)
+    if linktype != LINKTYPE_ETHERNET:
+        raise ValueError(f"unsupported link type {linktype}, expected Ethernet")
+    return endian, PCAP_MAGIC[magic]
+
+def _record_offsets_py(buf, endian):
+    """Offsets of the complete records in a pcap buffer (the only sequential step)."""
+    incl_len_at = struct.Struct(endian + "I").unpack_from
+    offsets = []
+    off, end = PCAP_HDR_LEN, len(buf)
+    while off + REC_HDR_LEN <= end:
+        nxt = off + REC_HDR_LEN + incl_len_at(buf, off + 8)[0]
+        if nxt > end:  # truncated last record (capture cut short)
+            break
+        offsets.append(off)
+        off = nxt
+    return np.array(offsets, dtype=np.int64)
+
+@njit(cache=True)  # compiled once, reused by later runs from __pycache__
+def _record_offsets_jit(buf, big_endian):
+    """Same scan as _record_offsets_py, compiled by numba."""
+    offsets = np.empty((buf.size - PCAP_HDR_LEN) // REC_HDR_LEN, dtype=np.int64)
+    off, end, n = PCAP_HDR_LEN, buf.size, 0
+    while off + REC_HDR_LEN <= end:
+        b0, b1, b2, b3 = (np.int64(buf[off + 8]), np.int64(buf[off + 9]),
+                          np.int64(buf[off + 10]), np.int64(buf[off + 11]))
+        incl_len = (b0 << 24 | b1 << 16 | b2 << 8 | b3) if big_endian else (b3 << 24 | b2 << 16 | b1 << 8 | b0)
+        nxt = off + REC_HDR_LEN + incl_len
+        if nxt > end:
+            break
+        offsets[n] = off
+        n += 1
+        off = nxt
+    return offsets[:n]
+
+def no_packets():
+    """The (ts, sport, dport, plen) arrays of a capture without QUIC records."""
+    return np.empty(0, np.int64), np.empty(0, np.uint16), np.empty(0, np.uint16), np.empty(0, np.uint32)
+
+def parse_pcap_to_arrays(pcap_path: str):
+    """
+    Extract (ts, sport, dport, plen) arrays for the UDP port-443 records (IPv4 and IPv6) of a pcap.
+
+    Only the record offsets are found sequentially; every header field is then
+    gathered for all records at once with array indexing.
+    """
+    with open(pcap_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < PCAP_HDR_LEN:
+            # Capture killed before its global header was written (empty or cut file): no packets
+            return no_packets()
+        # Queue readahead of the whole file so disk I/O overlaps the offset scan below
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        buf = np.memmap(f, dtype=np.uint8, mode="r")
+    try:
+        endian, ts_tick_ns = pcap_header(buf)
+    except ValueError:
+        # pcapng or a non-Ethernet link type: hand it to tshark's dissectors if available
+        if shutil.which("tshark") is None:
+            raise
+        return parse_with_tshark(pcap_path)
+    if HAVE_NUMBA:
+        offsets = _record_offsets_jit(buf, endian == ">")
+    else:
+        offsets = _record_offsets_py(buf, endian)
+
+    # 16-byte record headers of every record, viewed through the structured dtype
+    rec = buf[offsets[:, None] + np.arange(REC_HDR_LEN)].view(PCAP_REC_DTYPE.newbyteorder(endian))[:, 0]
+    incl_len = rec["incl_len"].astype(np.int64)
+
+    # IPv4 or IPv6 ethertype and UDP protocol, with room for a minimal IP header and the ports
+    # (IPv6: UDP directly after the fixed 40-byte header, no extension headers)
+    keep = incl_len >= ETH_HDR_LEN + 24
+    pkt, rec, incl_len = offsets[keep] + REC_HDR_LEN, rec[keep], incl_len[keep]
+    ip = pkt + ETH_HDR_LEN
+    v4 = (buf[pkt + 12] == 0x08) & (buf[pkt + 13] == 0x00) & (buf[ip + 9] == 17)
+    v6 = (buf[pkt + 12] == 0x86) & (buf[pkt + 13] == 0xDD) & (buf[ip + 6] == 17)
+    ip_len = np.where(v6, IPV6_HDR_LEN, (buf[ip].astype(np.int64) & 0x0F) * 4)
+    keep = (v4 | v6) & (incl_len >= ETH_HDR_LEN + ip_len + 4)
+    udp, rec = (ip + ip_len)[keep], rec[keep]
+
+    sport = buf[udp].astype(np.uint16) << 8 | buf[udp + 1]
+    dport = buf[udp + 2].astype(np.uint16) << 8 | buf[udp + 3]
+    keep = (sport == 443) | (dport == 443)
+    rec = rec[keep]
+    # Exact integer nanoseconds: a float64 epoch would round IATs to ~0.24 us
+    ts = rec["ts_sec"].astype(np.int64) * 10**9 + rec["ts_frac"].astype(np.int64) * ts_tick_ns
+    # plen is the on-wire length, so byte counts hold for snaplen-truncated captures too
+    return ts, sport[keep], dport[keep], rec["orig_len"].astype(np.uint32)
+
+def parse_with_tshark(pcap_path: str):
+    """Same arrays as parse_pcap_to_arrays, for any capture tshark can read."""
+    cmd = ["tshark", "-r", pcap_path, "-n", "-Y", "udp.port == 443", "-T", "fields",
+           "-E", "separator=,", "-E", "occurrence=f"]
+    for field in TSHARK_FIELDS:
+        cmd += ["-e", field]
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as proc:
+        lines = proc.stdout.read().splitlines()
+    if proc.returncode != 0:
+        raise RuntimeError(f"tshark failed on {pcap_path} (exit code {proc.returncode})")
+    if not lines:
+        return no_packets()
+    rec = np.loadtxt(lines, delimiter=",", dtype=TSHARK_DTYPE, ndmin=1)
+    # "sec.frac" -> int64 nanoseconds, like the pcap parser
+    sec, _, frac = np.char.partition(rec["ts"], ".").T
+    ts = sec.astype(np.int64) * 10**9 + np.char.ljust(frac, 9, "0").astype(np.int64)
+    return ts, rec["sport"], rec["dport"], rec["plen"]
+
+def analyse_arrays(ts, sport, dport, plen):
+    """Aggregate per-direction volume, packet counts, duration and IATs of the QUIC flow."""
+    # eBPF captures can hold records slightly out of timestamp order (CPUs race between
+    # taking the timestamp and reserving ring space): sort, or their IATs would go negative
+    if (np.diff(ts) < 0).any():
+        order = np.argsort(ts, kind="stable")
+        ts, sport, dport, plen = ts[order], sport[order], dport[order], plen[order]
+    up = dport == 443             # client -> server
+    down = (sport == 443) & ~up   # server -> client
+    flow_ts = ts[up | down]
+    duration = int(flow_ts[-1] - flow_ts[0]) / 1e9 if flow_ts.size else 0.0
     return {
-        "bytes_up": bytes_up, "bytes_down": bytes_down,
-        "pkt_up": pkt_up, "pkt_down": pkt_down,
-        "duration_s": duration, "iats_up": iats_up, "iats_down": iats_down
+        "bytes_up": int(plen[up].sum()), "bytes_down": int(plen[down].sum()),
+        "pkt_up": int(up.sum()), "pkt_down": int(down.sum()),
+        "duration_s": duration,
+        "iats_up": np.diff(ts[up]), "iats_down": np.diff(ts[down]),
     }
 
+def analyse_pcap(pcap_path: str):
+    return analyse_arrays(*parse_pcap_to_arrays(pcap_path))
+
+def iat_prefix(url, level, dropper, rep):
+    """The "url,level,dropper,rep," part shared by every IAT line of a run."""
+    if any(c in url for c in ',"\r\n'):
+        url = '"' + url.replace('"', '""') + '"'
+    return f"{url},{level},{dropper},{rep},"
+
+def dropper_hook(row):
+    """Drop hook of a run; nav_metrics.csv without the column comes from the TC ingress dropper."""
+    return row.get("dropper") or ("none" if row.get("mode") == "off" else "tc")
+
+def iat_block(prefix, iats):
+    """Preformatted IAT CSV lines for one run (int64 ns IATs), ready for a single write()."""
+    fmt = IAT_FORMAT_US if not (iats % 1000).any() else IAT_FORMAT_NS
+    return "".join([prefix + fmt % x + "\n" for x in (iats / 1e9).tolist()])
+
 def main():
     runs = load_runs()
     SUMMARY_CSV.parent.mkdir(parents=True, exist_ok=True)
-    with open(SUMMARY_CSV, "w", newline="") as fs, \
-         open(IAT_UP, "w", newline="") as fu, \
-         open(IAT_DOWN, "w", newline="") as fd:
-        ws = csv.DictWriter(fs, fieldnames=[
-            "url","level","rep","pcap","plt_ms","bytes_up","bytes_down","pkt_up","pkt_down","duration_s"
-        ])
-        ws.writeheader()
-        wi_u = csv.DictWriter(fu, fieldnames=["url","level","rep","iat_s"]); wi_u.writeheader()
-        wi_d = csv.DictWriter(fd, fieldnames=["url","level","rep","iat_s"]); wi_d.writeheader()
-
-        for row in runs:
-            res = analyse_pcap(row["pcap"])
-            ws.writerow({
-                "url": row["url"], "level": int(row["level"]), "rep": int(row["rep"]),
-                "pcap": row["pcap"], "plt_ms": float(row["plt_ms"]),
-                "bytes_up": res["bytes_up"], "bytes_down": res["bytes_down"],
-                "pkt_up": res["pkt_up"], "pkt_down": res["pkt_down"],
-                "duration_s": res["duration_s"]
-            })
-            for x in res["iats_up"]:
-                wi_u.writerow({"url": row["url"], "level": int(row["level"]), "rep": int(row["rep"]), "iat_s": x})
-            for x in res["iats_down"]:
-                wi_d.writerow({"url": row["url"], "level": int(row["level"]), "rep": int(row["rep"]), "iat_s": x})
+    with open(SUMMARY_CSV, "w", newline="", buffering=CSV_BUFFERING) as fs, \
+         gzip.open(IAT_UP, "wt", newline="", compresslevel=IAT_GZIP_LEVEL) as fu, \
+         gzip.open(IAT_DOWN, "wt", newline="", compresslevel=IAT_GZIP_LEVEL) as fd:
+        ws = csv.writer(fs)
+        ws.writerow(SUMMARY_COLUMNS)
+        fu.write(",".join(IAT_COLUMNS) + "\n")
+        fd.write(",".join(IAT_COLUMNS) + "\n")
+
+        # Pcaps are independent: parse them in worker processes, write results in run order
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+            results = pool.map(analyse_pcap, [row["pcap"] for row in runs])
+            for row, res in zip(runs, results):
+                url, level, rep = row["url"], int(row["level"]), int(row["rep"])
+                # XDP drops never reach the pcaps, TC ingress drops did: keep the hook with every row
+                dropper = dropper_hook(row)
+                # Positional row in SUMMARY_COLUMNS order, no per-row dict
+                ws.writerow((url, level, dropper, rep, row["pcap"], float(row["plt_ms"]),
+                             res["bytes_up"], res["bytes_down"], res["pkt_up"], res["pkt_down"],
+                             res["duration_s"]))
+                prefix = iat_prefix(url, level, dropper, rep)
+                fu.write(iat_block(prefix, res["iats_up"]))
+                fd.write(iat_block(prefix, res["iats_down"]))
 
 if __name__ == "__main__":
     main()
@@ -2,7 +2,8 @@
 set -euo pipefail
 
 # =======================================================================
-# Script to clean wfns namespace from background processes
+# Script to clean wfns namespaces from background processes
+# Usage: ./clean_netns.sh [NUM_NS]   (same NUM_NS as setup_netns.sh)
 # =======================================================================
 
 RED='\033[0;31m'
@@ -27,15 +28,8 @@ print_error() {
     echo -e "${RED}[ERROR]${NC} $1"
 }
 
-NS="wfns"
-
-# Check if namespace exists
-if ! sudo ip netns list | grep -q "^${NS}\b"; then
-    print_error "Namespace ${NS} not found"
-    exit 1
-fi
-
-print_status "Cleaning namespace ${NS}..."
+NUM_NS="${1:-1}"
+NS_BASE="wfns"
 
 # List of very specific patterns for processes to terminate ONLY in experiment context
 SAFE_PATTERNS=(
@@ -54,38 +48,72 @@ SAFE_PATTERNS=(
     "tcpdump -i veth1"
 )
 
-# Terminate only specific and safe processes
-for pattern in "${SAFE_PATTERNS[@]}"; do
-    if sudo ip netns exec "${NS}" pgrep -f "${pattern}" >/dev/null 2>&1; then
-        print_status "Terminating processes: ${pattern}..."
-        sudo ip netns exec "${NS}" pkill -f "${pattern}" || true
-        sleep 0.5
+# PIDs in namespace $1 whose command line matches $2 (like pgrep -f). pgrep/pkill run with
+# 'ip netns exec' would still see every process, including other worker namespaces' ones.
+ns_pgrep() {
+    local pid
+    for pid in $(sudo ip netns pids "$1"); do
+        if tr '\0' ' ' 2>/dev/null < "/proc/${pid}/cmdline" | grep -Eq -- "$2"; then
+            echo "${pid}"
+        fi
+    done
+}
+
+clean_namespace() {
+    local NS="$1"
+
+    # Check if namespace exists (exact name, wfns must not match wfns-1)
+    if ! sudo ip netns list | grep -Eq "^${NS}( |$)"; then
+        print_error "Namespace ${NS} not found"
+        exit 1
+    fi
+
+    print_status "Cleaning namespace ${NS}..."
+
+    # Terminate only specific and safe processes
+    for pattern in "${SAFE_PATTERNS[@]}"; do
+        PIDS=$(ns_pgrep "${NS}" "${pattern}")
+        if [[ -n "${PIDS}" ]]; then
+            print_status "Terminating processes: ${pattern}..."
+            sudo kill ${PIDS} 2>/dev/null || true
+            sleep 0.5
+        fi
+    done
+
+    # DON'T kill all user processes - too dangerous!
+    # Instead, only show which processes are still active for debugging
+    print_status "Processes still active in namespace:"
+    PIDS=$(sudo ip netns pids "${NS}" | paste -sd, -)
+    [[ -n "${PIDS}" ]] && ps -o user,pid,args --no-headers -p "${PIDS}" 2>/dev/null | head -10 || true
+
+    # Check active connections
+    ACTIVE_CONNECTIONS=$(sudo ip netns exec "${NS}" ss -tupln 2>/dev/null | wc -l)
+    if [[ $ACTIVE_CONNECTIONS -gt 1 ]]; then
+        print_warning "Connections still active:"
+        sudo ip netns exec "${NS}" ss -tupln
+    else
+        print_success "No active connections in namespace"
     fi
-done
 
-# DON'T kill all user processes - too dangerous!
-# Instead, only show which processes are still active for debugging
-print_status "Processes still active in namespace:"
-sudo ip netns exec "${NS}" ps aux --no-headers 2>/dev/null | grep -v "^root.*\[" | head -10 || true
-
-# Check active connections
-ACTIVE_CONNECTIONS=$(sudo ip netns exec "${NS}" ss -tupln 2>/dev/null | wc -l)
-if [[ $ACTIVE_CONNECTIONS -gt 1 ]]; then
-    print_warning "Connections still active:"
-    sudo ip netns exec "${NS}" ss -tupln
-else
-    print_success "No active connections in namespace"
-fi
-
-# Final test: check only active connections (quick test)
-print_status "Final verification of namespace state..."
-
-FINAL_CONNECTIONS=$(sudo ip netns exec "${NS}" ss -tupln 2>/dev/null | wc -l)
-if [[ $FINAL_CONNECTIONS -gt 1 ]]; then
-    print_warning "Still $((FINAL_CONNECTIONS-1)) active connections after cleanup:"
-    sudo ip netns exec "${NS}" ss -tupln | head -5
-else
-    print_success "Namespace completely clean - no active connections"
-fi
-
-print_success "Namespace ${NS} cleanup completed"
+    # Final test: check only active connections (quick test)
+    print_status "Final verification of namespace state..."
+
+    FINAL_CONNECTIONS=$(sudo ip netns exec "${NS}" ss -tupln 2>/dev/null | wc -l)
+    if [[ $FINAL_CONNECTIONS -gt 1 ]]; then
+        print_warning "Still $((FINAL_CONNECTIONS-1)) active connections after cleanup:"
+        sudo ip netns exec "${NS}" ss -tupln | head -5
+    else
+        print_success "Namespace completely clean - no active connections"
+    fi
+
+    print_success "Namespace ${NS} cleanup completed"
+}
+
+# Namespace i: wfns for i=0, wfns-i otherwise (see setup_netns.sh)
+for ((i = 0; i < NUM_NS; i++)); do
+    if [[ $i -eq 0 ]]; then
+        clean_namespace "${NS_BASE}"
+    else
+        clean_namespace "${NS_BASE}-${i}"
+    fi
+done
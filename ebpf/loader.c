@@ -17,12 +17,16 @@
 #include <net/if.h>
 #include <linux/pkt_cls.h>
 #include <signal.h>
+#include <poll.h>
 
 // --- Default Parameters ---
 #define DEFAULT_MIN_RATE_PPS 1000
 #define DEFAULT_MAX_RATE_PPS 100000
 #define DEFAULT_MAX_PROBABILITY 50
 #define UPDATE_INTERVAL_SEC 1
+#define SNAPLEN 128
+#define RB_POLL_MS 100
+#define CLOSE_GRACE_NS 2000000  // 2 ms for program runs still writing an event at CLOSE
 
 // Define our operating modes
 enum operating_mode {
@@ -30,16 +34,38 @@ enum operating_mode {
     MODE_FIXED,
 };
 
-struct state {
+// Must match packet_dropper.bpf.c
+struct config {
+    __u32 drop_probability;
+    __u32 capture;
+};
+
+struct pkt_event {
+    __u64 ts_ns;
+    __u32 len;
+    __u32 caplen;
+    __u32 gen;
+    __u8 data[SNAPLEN];
+};
+
+struct stats {
     __u64 packet_count;
     __u64 dropped_count;
-    __u32 drop_probability;
 };
 
 static int ifindex_g;
+static struct bpf_link *xdp_link_g;
 
-// (cleanup and get_time_ns functions remain the same)
+// --capture state: current pcap file, its capture generation (config.capture while it is
+// open, copied into every event) and CLOCK_REALTIME - CLOCK_MONOTONIC at OPEN time
+static FILE *pcap_g;
+static __u32 pcap_gen_g;
+static __s64 mono_to_real_ns_g;
+
+// (get_time_ns function remains the same)
 static void cleanup(int sig) {
+    // The XDP link would also go away with our fds on exit, detach it explicitly anyway
+    if (xdp_link_g) bpf_link__destroy(xdp_link_g);
     DECLARE_LIBBPF_OPTS(bpf_tc_hook, hook, .ifindex = ifindex_g,
                         .attach_point = BPF_TC_INGRESS | BPF_TC_EGRESS);
     bpf_tc_hook_destroy(&hook);
@@ -52,6 +78,80 @@ static __u64 get_time_ns() {
     return ts.tv_sec * 1000000000ULL + ts.tv_nsec;
 }
 
+// Tell the parent (run_measurements.py) that the programs are attached and configured
+static void signal_ready(void) {
+    printf("READY\n");
+    fflush(stdout);
+}
+
+static void reply(const char *msg) {
+    printf("%s\n", msg);
+    fflush(stdout);
+}
+
+// Classic pcap, nanosecond variant (magic 0xa1b23c4d), Ethernet link type
+static int pcap_open(const char *path) {
+    struct {
+        __u32 magic; __u16 major, minor; __s32 thiszone;
+        __u32 sigfigs, snaplen, linktype;
+    } hdr = { 0xa1b23c4d, 2, 4, 0, 0, SNAPLEN, 1 };
+    struct timespec mono, real;
+
+    pcap_g = fopen(path, "wb");
+    if (!pcap_g) { perror("fopen"); return -1; }
+    setvbuf(pcap_g, NULL, _IOFBF, 1 << 16);
+    fwrite(&hdr, sizeof(hdr), 1, pcap_g);
+    clock_gettime(CLOCK_MONOTONIC, &mono);
+    clock_gettime(CLOCK_REALTIME, &real);
+    mono_to_real_ns_g = (real.tv_sec - mono.tv_sec) * 1000000000LL + (real.tv_nsec - mono.tv_nsec);
+    return 0;
+}
+
+static int handle_event(void *ctx, void *data, size_t size) {
+    const struct pkt_event *ev = data;
+    __u64 ts = ev->ts_ns + mono_to_real_ns_g;
+    __u32 rec[4] = { ts / 1000000000ULL, ts % 1000000000ULL, ev->caplen, ev->len };
+
+    // Events of an earlier pcap submitted after its CLOSE are dropped, not mixed into this one
+    if (!pcap_g || ev->gen != pcap_gen_g) return 0;
+    fwrite(rec, sizeof(rec), 1, pcap_g);
+    fwrite(ev->data, ev->caplen, 1, pcap_g);
+    return 0;
+}
+
+static int set_config(int config_fd, const struct config *cfg) {
+    __u32 key = 0;
+    return bpf_map_update_elem(config_fd, &key, cfg, BPF_ANY);
+}
+
+// One control line from the parent: "OPEN <path>" starts a pcap, "CLOSE" finishes it.
+// CLOSE replies only after the final drain, and the parent waits for it before the next OPEN.
+static void handle_command(char *line, int config_fd, struct config *cfg, struct ring_buffer *rb) {
+    const struct timespec grace = { 0, CLOSE_GRACE_NS };
+
+    line[strcspn(line, "\n")] = '\0';
+    if (strncmp(line, "OPEN ", 5) == 0) {
+        if (pcap_g || pcap_open(line + 5)) { reply("ERR"); return; }
+        if (++pcap_gen_g == 0) pcap_gen_g = 1;  // 0 means "not capturing"
+        cfg->capture = pcap_gen_g;
+        set_config(config_fd, cfg);
+        reply("OK");
+    } else if (strcmp(line, "CLOSE") == 0) {
+        cfg->capture = 0;
+        set_config(config_fd, cfg);
+        // Drain what the programs submitted before capture was switched off, then once more
+        // after a grace period for runs that had already reserved an event. A run slower than
+        // that still loses its packet (gen check in handle_event), it never lands in the next pcap.
+        ring_buffer__consume(rb);
+        nanosleep(&grace, NULL);
+        ring_buffer__consume(rb);
+        if (pcap_g) { fclose(pcap_g); pcap_g = NULL; }
+        reply("OK");
+    } else {
+        reply("ERR");
+    }
+}
+
 static void usage(const char *prog) {
     fprintf(stderr,
         "Usage: sudo %s <interface> --mode <dynamic|fixed> [options]\n\n"
@@ -65,6 +165,8 @@ static void usage(const char *prog) {
         "Options for 'fixed' mode:\n"
         "  --prob <int>             Fixed drop probability (0-100, required for fixed mode)\n\n"
         "General options:\n"
+        "  --capture                Mirror UDP/443 packets to pcap files, driven by\n"
+        "                           OPEN <path> / CLOSE lines on stdin\n"
         "  -h, --help               Display this help message\n"
         , prog, DEFAULT_MAX_PROBABILITY, DEFAULT_MIN_RATE_PPS, DEFAULT_MAX_RATE_PPS);
 }
@@ -72,7 +174,7 @@ static void usage(const char *prog) {
 int main(int argc, char **argv) {
     struct bpf_object *bpf_obj;
     struct bpf_program *ing_prog, *eg_prog;
-    int map_fd;
+    int config_fd, stats_fd;
     __u64 last_time_ns = 0, last_packet_count = 0;
 
     // --- New variables for mode selection ---
@@ -83,6 +185,7 @@ int main(int argc, char **argv) {
     long max_prob = DEFAULT_MAX_PROBABILITY;
     long min_rate = DEFAULT_MIN_RATE_PPS;
     long max_rate = DEFAULT_MAX_RATE_PPS;
+    int capture = 0;
     int opt;
 
     // --- Add new options to getopt_long ---
@@ -92,6 +195,7 @@ int main(int argc, char **argv) {
         {"max-prob", required_argument, 0, 'P'},
         {"min-rate", required_argument, 0, 'm'},
         {"max-rate", required_argument, 0, 'M'},
+        {"capture",  no_argument,       0, 'c'},
         {"help",     no_argument,       0, 'h'},
         {0, 0, 0, 0}
     };
@@ -116,6 +220,7 @@ int main(int argc, char **argv) {
             case 'P': max_prob = atol(optarg); break;
             case 'm': min_rate = atol(optarg); break;
             case 'M': max_rate = atol(optarg); break;
+            case 'c': capture = 1; break;
             case 'h': default: usage(argv[0]); return 1;
         }
     }
@@ -168,59 +273,92 @@ int main(int argc, char **argv) {
     ing_prog = bpf_object__find_program_by_name(bpf_obj, "handle_ingress");
     eg_prog = bpf_object__find_program_by_name(bpf_obj, "handle_egress");
     if (!ing_prog || !eg_prog) { fprintf(stderr, "Finding programs failed\n"); bpf_object__close(bpf_obj); return 1; }
+    // Ingress: XDP link (native on veth when available, generic otherwise).
+    // bpf_program__attach_xdp is used rather than bpf_xdp_attach, which older libbpf lacks.
+    xdp_link_g = bpf_program__attach_xdp(ing_prog, ifindex_g);
+    if (libbpf_get_error(xdp_link_g)) {
+        fprintf(stderr, "Failed to attach XDP ingress program: %s\n", strerror(-libbpf_get_error(xdp_link_g)));
+        xdp_link_g = NULL; bpf_object__close(bpf_obj); return 1;
+    }
+    // Egress: TC classifier on clsact
     DECLARE_LIBBPF_OPTS(bpf_tc_hook, hook, .ifindex = ifindex_g, .attach_point = BPF_TC_INGRESS | BPF_TC_EGRESS);
     int err = bpf_tc_hook_create(&hook);
-    if (err && err != -EEXIST) { fprintf(stderr, "Failed to create TC hook: %s\n", strerror(-err)); bpf_object__close(bpf_obj); return 1; }
-    DECLARE_LIBBPF_OPTS(bpf_tc_opts, ing_opts, .prog_fd = bpf_program__fd(ing_prog), .flags = BPF_TC_F_REPLACE);
-    hook.attach_point = BPF_TC_INGRESS;
-    err = bpf_tc_attach(&hook, &ing_opts);
-    if (err) { fprintf(stderr, "Failed to attach ingress program: %s\n", strerror(-err)); cleanup(0); return 1; }
+    if (err && err != -EEXIST) { fprintf(stderr, "Failed to create TC hook: %s\n", strerror(-err)); cleanup(0); return 1; }
     DECLARE_LIBBPF_OPTS(bpf_tc_opts, eg_opts, .prog_fd = bpf_program__fd(eg_prog), .flags = BPF_TC_F_REPLACE);
     hook.attach_point = BPF_TC_EGRESS;
     err = bpf_tc_attach(&hook, &eg_opts);
     if (err) { fprintf(stderr, "Failed to attach egress program: %s\n", strerror(-err)); cleanup(0); return 1; }
-    map_fd = bpf_object__find_map_fd_by_name(bpf_obj, "state_map");
-    if (map_fd < 0) { fprintf(stderr, "Finding map failed\n"); cleanup(0); return 1; }
+    config_fd = bpf_object__find_map_fd_by_name(bpf_obj, "config_map");
+    stats_fd = bpf_object__find_map_fd_by_name(bpf_obj, "stats_map");
+    if (config_fd < 0 || stats_fd < 0) { fprintf(stderr, "Finding maps failed\n"); cleanup(0); return 1; }
     signal(SIGINT, cleanup);
     signal(SIGTERM, cleanup);
 
 
-    // --- Main Logic: Choose loop based on mode ---
-    if (mode == MODE_FIXED) {
-        // --- Fixed Mode Loop ---
-        __u32 key = 0;
-        struct state fixed_state = { .packet_count = 0, .dropped_count = 0, .drop_probability = prob };
-        if (bpf_map_update_elem(map_fd, &key, &fixed_state, BPF_ANY) != 0) {
-            fprintf(stderr, "Error setting fixed probability in map.\n");
-            cleanup(0);
-            return 1;
-        }
+    struct config cfg = { .drop_probability = mode == MODE_FIXED ? prob : 0 };
+    if (set_config(config_fd, &cfg) != 0) {
+        fprintf(stderr, "Error setting drop probability in map.\n");
+        cleanup(0);
+        return 1;
+    }
+
+    struct ring_buffer *rb = NULL;
+    if (capture) {
+        int events_fd = bpf_object__find_map_fd_by_name(bpf_obj, "events");
+        rb = events_fd < 0 ? NULL : ring_buffer__new(events_fd, handle_event, NULL, NULL);
+        if (libbpf_get_error(rb) || !rb) { fprintf(stderr, "Failed to create ring buffer\n"); cleanup(0); return 1; }
+    }
+
+    if (mode == MODE_FIXED && !capture) {
+        signal_ready();
         // Fixed mode - just wait without printing stats
         while (1) {
             sleep(30); // Just keep the program alive
         }
-    } else {
-        // Dynamic mode - update drop probability based on packet rate
-        last_time_ns = get_time_ns();
-        while (1) {
-            sleep(UPDATE_INTERVAL_SEC);
-            __u32 key = 0;
-            struct state current_state;
-            if (bpf_map_lookup_elem(map_fd, &key, &current_state) != 0) { continue; }
-            __u64 current_time_ns = get_time_ns();
-            __u64 time_diff_ns = current_time_ns - last_time_ns;
-            __u64 count_diff = current_state.packet_count - last_packet_count;
-            last_time_ns = current_time_ns;
-            last_packet_count = current_state.packet_count;
-            double pps = (double)count_diff * 1e9 / time_diff_ns;
-            __u32 new_prob = 0;
-            if (pps > min_rate) {
-                if (pps >= max_rate) { new_prob = max_prob; }
-                else { new_prob = (__u32)(((pps - min_rate) / (max_rate - min_rate)) * max_prob); }
+    }
+
+    // Dynamic mode and/or capture: one loop that polls the ring buffer and stdin,
+    // and updates the drop probability every UPDATE_INTERVAL_SEC in dynamic mode
+    int nr_cpus = libbpf_num_possible_cpus();
+    if (nr_cpus <= 0) { fprintf(stderr, "Failed to get number of CPUs\n"); cleanup(0); return 1; }
+    struct stats *percpu = calloc(nr_cpus, sizeof(*percpu));
+    if (!percpu) { cleanup(0); return 1; }
+    char line[512];
+    signal_ready();
+    last_time_ns = get_time_ns();
+    while (1) {
+        if (rb) {
+            ring_buffer__poll(rb, RB_POLL_MS);
+            struct pollfd pfd = { .fd = STDIN_FILENO, .events = POLLIN };
+            if (poll(&pfd, 1, 0) > 0) {
+                // EOF: the parent went away, detach and exit
+                if (!fgets(line, sizeof(line), stdin)) cleanup(0);
+                handle_command(line, config_fd, &cfg, rb);
             }
-            current_state.drop_probability = new_prob;
-            bpf_map_update_elem(map_fd, &key, &current_state, BPF_ANY);
+        } else {
+            sleep(UPDATE_INTERVAL_SEC);
+        }
+        if (mode != MODE_DYNAMIC) continue;
+
+        __u64 current_time_ns = get_time_ns();
+        __u64 time_diff_ns = current_time_ns - last_time_ns;
+        if (time_diff_ns < UPDATE_INTERVAL_SEC * 1000000000ULL) continue;
+        __u32 key = 0;
+        // Per-CPU map: one value per possible CPU, sum them for the total
+        if (bpf_map_lookup_elem(stats_fd, &key, percpu) != 0) { continue; }
+        __u64 packet_count = 0;
+        for (int cpu = 0; cpu < nr_cpus; cpu++) packet_count += percpu[cpu].packet_count;
+        __u64 count_diff = packet_count - last_packet_count;
+        last_time_ns = current_time_ns;
+        last_packet_count = packet_count;
+        double pps = (double)count_diff * 1e9 / time_diff_ns;
+        __u32 new_prob = 0;
+        if (pps > min_rate) {
+            if (pps >= max_rate) { new_prob = max_prob; }
+            else { new_prob = (__u32)(((pps - min_rate) / (max_rate - min_rate)) * max_prob); }
         }
+        cfg.drop_probability = new_prob;
+        set_config(config_fd, &cfg);
     }
 
     return 0;
@@ -1,56 +1,210 @@
 // SPDX-License-Identifier: GPL-2.0
 #include <linux/bpf.h>
 #include <linux/pkt_cls.h>
+#include <linux/if_ether.h>
+#include <linux/ip.h>
+#include <linux/ipv6.h>
+#include <linux/udp.h>
+#include <linux/in.h>
 #include <bpf/bpf_helpers.h>
+#include <bpf/bpf_endian.h>
 
-/* This struct holds the shared state between kernel and user space. */
-struct state {
+#define SNAPLEN 128   // Bytes kept per captured packet (same as tcpdump -s 128)
+#define QUIC_PORT 443
+
+/* Drop configuration, written by user space and only read by the programs. */
+struct config {
+    __u32 drop_probability;   // The current drop probability (0-100), set by user space.
+    __u32 capture;            // Capture generation, non-zero while user space records a pcap (loader --capture).
+};
+
+/* Per-CPU counters: plain increments on the packet path, user space sums the CPUs. */
+struct stats {
     __u64 packet_count;       // A counter for all packets seen.
     __u64 dropped_count;      // A counter for dropped packets.
-    __u32 drop_probability;   // The current drop probability (0-100), set by user space.
 };
 
-/* The eBPF map definition. */
+/* The eBPF map definitions. */
 struct {
     __uint(type, BPF_MAP_TYPE_ARRAY);
     __uint(max_entries, 1);
     __type(key, __u32);
-    __type(value, struct state);
-} state_map SEC(".maps");
+    __type(value, struct config);
+} config_map SEC(".maps");
+
+struct {
+    __uint(type, BPF_MAP_TYPE_PERCPU_ARRAY);
+    __uint(max_entries, 1);
+    __type(key, __u32);
+    __type(value, struct stats);
+} stats_map SEC(".maps");
+
+/* Captured packets (UDP port 443, after the drop decision) for the loader's pcap writer. */
+struct pkt_event {
+    __u64 ts_ns;              // bpf_ktime_get_ns(), converted to wall clock by user space
+    __u32 len;                // Length on the wire
+    __u32 caplen;             // Bytes present in data
+    __u32 gen;                // config.capture when the packet was seen: its pcap
+    __u8 data[SNAPLEN];
+};
+
+struct {
+    __uint(type, BPF_MAP_TYPE_RINGBUF);
+    __uint(max_entries, 1 << 22);
+} events SEC(".maps");
 
 // We pass a simple integer (1 for ingress, 2 for egress) to avoid string relocation issues.
-static __always_inline int handle_packet(struct __sk_buff *skb, __u32 direction)
+// Returns non-zero when the packet should be dropped.
+static __always_inline int should_drop(__u32 direction)
 {
     __u32 key = 0;
-    struct state *s;
+    struct config *cfg;
+    struct stats *st;
 
-    s = bpf_map_lookup_elem(&state_map, &key);
-    if (!s) {
-        return TC_ACT_OK;
+    cfg = bpf_map_lookup_elem(&config_map, &key);
+    st = bpf_map_lookup_elem(&stats_map, &key);
+    if (!cfg || !st) {
+        return 0;
     }
 
-    __sync_fetch_and_add(&s->packet_count, 1);
+    st->packet_count++;
 
-    if ((bpf_get_prandom_u32() % 100) < s->drop_probability) {
-        __sync_fetch_and_add(&s->dropped_count, 1);
+    if ((bpf_get_prandom_u32() % 100) < cfg->drop_probability) {
+        st->dropped_count++;
         // Use %u to print the direction integer instead of %s.
-        bpf_printk("TC dir=%u: Dropping packet, probability=%u\n", direction, s->drop_probability);
-        return TC_ACT_SHOT;
+        bpf_printk("dir=%u: Dropping packet, probability=%u\n", direction, cfg->drop_probability);
+        return 1;
     }
 
-    return TC_ACT_OK;
+    return 0;
 }
 
-SEC("classifier")
-int handle_ingress(struct __sk_buff *skb) {
+/* Current capture generation, 0 when no pcap is open. */
+static __always_inline __u32 capture_gen(void)
+{
+    __u32 key = 0;
+    struct config *cfg = bpf_map_lookup_elem(&config_map, &key);
+
+    return cfg ? cfg->capture : 0;
+}
+
+/* Equivalent of the "udp and port 443" capture filter (IPv4, and IPv6 without extension headers). */
+static __always_inline int is_quic(void *data, void *data_end)
+{
+    struct ethhdr *eth = data;
+    struct iphdr *iph = data + sizeof(*eth);
+    struct ipv6hdr *ip6h = data + sizeof(*eth);
+    struct udphdr *udp;
+
+    if ((void *)(eth + 1) > data_end) {
+        return 0;
+    }
+    if (eth->h_proto == bpf_htons(ETH_P_IP)) {
+        if ((void *)(iph + 1) > data_end || iph->protocol != IPPROTO_UDP || iph->ihl < 5) {
+            return 0;
+        }
+        udp = (void *)iph + iph->ihl * 4;
+    } else if (eth->h_proto == bpf_htons(ETH_P_IPV6)) {
+        if ((void *)(ip6h + 1) > data_end || ip6h->nexthdr != IPPROTO_UDP) {
+            return 0;
+        }
+        udp = (void *)(ip6h + 1);
+    } else {
+        return 0;
+    }
+    if ((void *)(udp + 1) > data_end) {
+        return 0;
+    }
+    return udp->source == bpf_htons(QUIC_PORT) || udp->dest == bpf_htons(QUIC_PORT);
+}
+
+static __always_inline void capture_xdp(struct xdp_md *ctx)
+{
+    void *data = (void *)(long)ctx->data;
+    void *data_end = (void *)(long)ctx->data_end;
+    struct pkt_event *ev;
+    __u32 gen = capture_gen();
+    __u64 ts;
+    __u32 i;
+
+    if (!gen || !is_quic(data, data_end)) {
+        return;
+    }
+    // Timestamp before reserving, so ring order follows timestamps on each CPU
+    ts = bpf_ktime_get_ns();
+    ev = bpf_ringbuf_reserve(&events, sizeof(*ev), 0);
+    if (!ev) {
+        return;
+    }
+    ev->ts_ns = ts;
+    ev->gen = gen;
+    ev->len = data_end - data;
+    for (i = 0; i < SNAPLEN; i++) {
+        if (data + i + 1 > data_end) {
+            break;
+        }
+        ev->data[i] = *(__u8 *)(data + i);
+    }
+    ev->caplen = i;
+    bpf_ringbuf_submit(ev, 0);
+}
+
+static __always_inline void capture_skb(struct __sk_buff *skb)
+{
+    void *data = (void *)(long)skb->data;
+    void *data_end = (void *)(long)skb->data_end;
+    struct pkt_event *ev;
+    __u32 gen = capture_gen();
+    __u32 n = skb->len;
+    __u64 ts;
+
+    if (!gen || !is_quic(data, data_end)) {
+        return;
+    }
+    if (n > SNAPLEN) {
+        n = SNAPLEN;
+    }
+    if (n == 0) {
+        return;
+    }
+    ts = bpf_ktime_get_ns();
+    ev = bpf_ringbuf_reserve(&events, sizeof(*ev), 0);
+    if (!ev) {
+        return;
+    }
+    // bpf_skb_load_bytes also copies from non-linear skb data
+    if (bpf_skb_load_bytes(skb, 0, ev->data, n) < 0) {
+        bpf_ringbuf_discard(ev, 0);
+        return;
+    }
+    ev->ts_ns = ts;
+    ev->gen = gen;
+    ev->len = skb->len;
+    ev->caplen = n;
+    bpf_ringbuf_submit(ev, 0);
+}
+
+/* Ingress runs at XDP, before an skb is allocated for the packet. */
+SEC("xdp")
+int handle_ingress(struct xdp_md *ctx) {
     // Pass '1' to represent Ingress
-    return handle_packet(skb, 1);
+    if (should_drop(1)) {
+        return XDP_DROP;
+    }
+    // Only delivered packets are captured, as tcpdump would see them
+    capture_xdp(ctx);
+    return XDP_PASS;
 }
 
+/* XDP has no egress hook, so egress stays a TC classifier. */
 SEC("classifier")
 int handle_egress(struct __sk_buff *skb) {
     // Pass '2' to represent Egress
-    return handle_packet(skb, 2);
+    if (should_drop(2)) {
+        return TC_ACT_SHOT;
+    }
+    capture_skb(skb);
+    return TC_ACT_OK;
 }
 
 char LICENSE[] SEC("license") = "GPL";
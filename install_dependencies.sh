@@ -85,7 +85,7 @@ install_python_dependencies() {
     
     source venv/bin/activate
     pip install --upgrade pip
-    pip install selenium scapy pandas numpy matplotlib tqdm
+    pip install selenium pandas numpy numba matplotlib tqdm pyroute2
     deactivate
     print_success "Python environment ready"
 }
@@ -116,8 +116,10 @@ install_chrome_and_chromedriver() {
 
 install_networking_tools() {
     print_status "Installing networking tools..."
-    sudo apt install -y \
+    # tshark (and capinfos) via noninteractive install to skip the capture-permissions prompt
+    sudo DEBIAN_FRONTEND=noninteractive apt install -y \
         tcpdump \
+        tshark \
         iproute2 \
         iptables
     print_success "Networking tools installed"
@@ -9,14 +9,19 @@ PLOTS = OUT / "plot"  # Use out/plot directory
 PLOTS.mkdir(parents=True, exist_ok=True)
 
 summary = pd.read_csv(OUT / "summary.csv")
-iat_up = pd.read_csv(OUT / "iat_up.csv")
-iat_down = pd.read_csv(OUT / "iat_down.csv")
+iat_up = pd.read_csv(OUT / "iat_up.csv.gz")
+iat_down = pd.read_csv(OUT / "iat_down.csv.gz")
 
 # Debug: Print data summary
 print(f"Summary data shape: {summary.shape}")
 print(f"Levels found: {sorted(summary['level'].unique())}")
 print(f"Level counts: {summary['level'].value_counts().sort_index()}")
 print(f"Metrics available: {list(summary.columns)}")
+# Runs dropping at XDP (dropped packets absent from the pcaps) and at TC ingress (present)
+# count downlink traffic differently, so their results should not be pooled
+hooks = set(summary["dropper"]) - {"none"} if "dropper" in summary.columns else set()
+if len(hooks) > 1:
+    print(f"WARNING: results mix dropper hooks {sorted(hooks)}, pkt_down/bytes_down/IATs are not comparable")
 print()
 
 def format_value_with_unit(value, unit):
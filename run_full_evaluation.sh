@@ -109,12 +109,12 @@ else
 fi
 
 # Check if Python dependencies are installed
-if python3 -c "import pandas, numpy, matplotlib, scapy, selenium, tqdm" 2>/dev/null; then
+if python3 -c "import pandas, numpy, matplotlib, selenium, tqdm, pyroute2" 2>/dev/null; then
     print_success "Python dependencies available"
 elif [[ -f "venv/bin/activate" ]]; then
     print_status "Using project virtual environment..."
     source venv/bin/activate
-    if python3 -c "import pandas, numpy, matplotlib, scapy, selenium, tqdm" 2>/dev/null; then
+    if python3 -c "import pandas, numpy, matplotlib, selenium, tqdm, pyroute2" 2>/dev/null; then
         print_success "Python dependencies available in venv"
     else
         print_error "Python dependencies missing in venv. Run: ./install_dependencies.sh"
@@ -279,7 +279,7 @@ else
 fi
 
 # Verify that analysis files were created
-for file in "out/summary.csv" "out/iat_up.csv" "out/iat_down.csv"; do
+for file in "out/summary.csv" "out/iat_up.csv.gz" "out/iat_down.csv.gz"; do
     if [[ ! -f "$file" ]]; then
         print_error "File $file not found"
         exit 1
@@ -336,8 +336,8 @@ echo
 print_status "Generated files:"
 echo "  • out/nav_metrics.csv     - Raw navigation metrics"
 echo "  • out/summary.csv         - Aggregated statistics"
-echo "  • out/iat_up.csv         - Uplink inter-arrival times"
-echo "  • out/iat_down.csv       - Downlink inter-arrival times"
+echo "  • out/iat_up.csv.gz      - Uplink inter-arrival times"
+echo "  • out/iat_down.csv.gz    - Downlink inter-arrival times"
 echo "  • out/plots/*.png        - Plots and visualizations ($PLOT_COUNT files)"
 echo "  • out/pcaps/*.pcap       - Packet capture files"
 echo
@@ -20,11 +20,19 @@ Modes:
 - 'dynamic': Variable drop rates based on traffic patterns
 """
 
-import os, csv, time, shlex, signal, tempfile, random, argparse, atexit, shutil, re, subprocess
+import os, csv, time, itertools, shlex, signal, tempfile, random, argparse, atexit, shutil, re, subprocess, ctypes, socket, select, hashlib, struct, threading, multiprocessing
 from pathlib import Path
 from datetime import datetime
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from dataclasses import dataclass
 from tqdm import tqdm
+from pyroute2 import IPRoute, DiagSocket
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 # -------------------------- Default Configuration --------------------------
 # These constants define the default setup for the evaluation environment
@@ -34,56 +42,222 @@ PCAPS_DIR  = OUT_DIR / "pcaps"  # Subdirectory for packet capture files
 CSV_PATH   = OUT_DIR / "nav_metrics.csv"  # Main results file with navigation metrics
 EBPF_DIR   = Path("ebpf")   # Directory containing eBPF programs and loader
 LOADER_BIN = EBPF_DIR / "loader"  # Compiled eBPF loader binary
+# Hook the loader drops downlink packets at, recorded in every row: at XDP the dropped
+# packets never reach the veth1 captures, with the former TC ingress hook they did
+DROPPER_HOOK = "xdp"
+# Chrome profiles live on tmpfs when there is one, so profile writes never hit the disk
+PROFILE_ROOT = Path("/dev/shm") if os.path.isdir("/dev/shm") else Path(tempfile.gettempdir())
+
+@lru_cache(maxsize=None)
+def run_dir():
+    """
+    Private directory of this run on PROFILE_ROOT (mkdtemp: mode 0700, unguessable name),
+    for the Chrome wrapper scripts, profiles and profile template
+    
+    This script runs as root and executes what it puts here, so nothing goes to a
+    predictable path in the world-writable /dev/shm. main() creates it before the
+    pool workers are forked, so they inherit the same directory; the main process
+    removes it with its contents on exit.
+    """
+    d = Path(tempfile.mkdtemp(prefix="wf-run-", dir=PROFILE_ROOT))
+    atexit.register(shutil.rmtree, d, ignore_errors=True)
+    return d
 
 # -------------------------- Shell Command Utilities ------------------------------
 # These functions provide safe ways to execute shell commands in different contexts
-def sh(cmd: str):
+# Commands are argv lists: no /bin/sh in between, so no quoting to get wrong
+def run_cmd(args, *, input=None, output=True):
+    """
+    Run a command to completion
+    
+    With output=False stdout goes straight to /dev/null and only stderr is kept
+    (for error messages), so there is one pipe less to create and drain.
+    A missing binary is reported like a shell would (exit code 127) instead of
+    raising, so callers only ever have to look at the return code.
+    """
+    # With an absolute path and close_fds=False subprocess can use posix_spawn
+    # (vfork-style) instead of fork(), which would copy the page tables of this
+    # (selenium-sized) process. Our own fds are non-inheritable (PEP 446), so
+    # nothing leaks into the child.
+    args = [shutil.which(args[0]) or args[0], *args[1:]]
+    try:
+        return subprocess.run(args, input=input, stdout=subprocess.PIPE if output else subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, text=True, close_fds=False)
+    except FileNotFoundError as e:
+        return subprocess.CompletedProcess(args, 127, "", str(e))
+
+def sh_check(*args, input=None):
     """
-    Execute a shell command in the host environment
+    Execute a command in the host environment, discarding its stdout
     
     Args:
-        cmd: Shell command string to execute
+        args: Command and arguments (argv, not a shell string)
+        input: Optional text fed to the command's stdin
         
+    Returns:
+        CompletedProcess with stderr and return code
+        
+    Used for: Host-level setup/teardown like traffic control
+    """
+    return run_cmd(list(args), input=input, output=False)
+
+def sh_out(*args, input=None):
+    """
+    Execute a command in the host environment and capture its output
+    
     Returns:
         CompletedProcess with stdout, stderr, and return code
         
-    Used for: Host-level operations like traffic control setup
+    Used for: Commands whose output is parsed (route lookup, --version, diagnostics)
     """
-    return subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    return run_cmd(list(args), input=input)
+
+CLONE_NEWNET = 0x40000000  # setns(2) nstype for network namespaces
+_libc = ctypes.CDLL(None, use_errno=True)
 
-def ns_sh(ns: str, cmd: str):
+@lru_cache(maxsize=None)
+def ns_fd(ns: str):
     """
-    Execute a shell command inside a specific network namespace
+    Open (once) the namespace handle that 'ip netns add' bind-mounts under /var/run/netns
+    
+    The descriptor stays open for the life of the script, for the setns()
+    calls of in_ns (child processes enter namespaces with nsenter, see ns_argv).
+    """
+    return os.open(f"/var/run/netns/{ns}", os.O_RDONLY)
+
+def ns_argv(ns: str, *args):
+    """
+    Prefix a command with nsenter so that it runs inside a network namespace
+    
+    Args:
+        ns: Network namespace name
+        args: Command and arguments
+        
+    Why nsenter rather than setns() in a preexec_fn:
+    - preexec_fn is not safe in a process that runs threads (tqdm's monitor, the
+      socket capture reader): the child can deadlock on a lock held at fork time
+    - Without preexec_fn subprocess can use posix_spawn (see run_cmd)
+    - nsenter execs the command in place, so the child pid is the command's own
+    - Only the network namespace is switched; the /etc/netns bind mounts that
+      'ip netns exec' adds are not applied (get_ns_wrapper keeps it for Chrome's DNS)
+    """
+    return ["nsenter", f"--net=/var/run/netns/{ns}", "--", *args]
+
+def setns(fd: int, ns: str):
+    """Move the calling thread into the network namespace behind fd"""
+    if _libc.setns(fd, CLONE_NEWNET) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"setns({ns}): {os.strerror(err)}")
+
+@contextmanager
+def in_ns(ns: str):
+    """
+    Run a block of this (Python) thread inside a network namespace
+    
+    No fork is involved: setns() only moves the calling thread, for the block.
+    Sockets created inside the block, e.g. pyroute2 netlink sockets, belong to
+    the namespace and keep working after the thread switches back.
+    """
+    own = os.open("/proc/thread-self/ns/net", os.O_RDONLY)
+    try:
+        setns(ns_fd(ns), ns)
+        try:
+            yield
+        finally:
+            setns(own, "self")
+    finally:
+        os.close(own)
+
+def ns_check(ns: str, *args, input=None):
+    """
+    Execute a command inside a specific network namespace, discarding its stdout
     
     Args:
         ns: Network namespace name (e.g., "wfns")
-        cmd: Shell command to execute inside the namespace
+        args: Command and arguments to execute inside the namespace
+        input: Optional text fed to the command's stdin
         
     Returns:
-        CompletedProcess with command results
+        CompletedProcess with stderr and return code
         
     Used for: Namespace-specific operations like ping tests, process cleanup
     """
-    return sh(f"ip netns exec {shlex.quote(ns)} sh -lc {shlex.quote(cmd)}")
+    return run_cmd(ns_argv(ns, *args), input=input, output=False)
+
+def ns_out(ns: str, *args, input=None):
+    """
+    Execute a command inside a specific network namespace and capture its output
+    
+    Returns:
+        CompletedProcess with stdout, stderr, and return code
+        
+    Used for: Namespace-specific queries (routes, links, Chrome version)
+    """
+    return run_cmd(ns_argv(ns, *args), input=input)
 
-def run_in_ns(ns: str, cmd: str, env=None):
+def run_in_ns(ns: str, *args, env=None, stdin=None, stdout=None, stderr=None):
     """
     Start a background process inside a network namespace
     
     Args:
         ns: Network namespace name
-        cmd: Command to run as background process
+        args: Command and arguments to run as background process
         env: Optional environment variables
+        stdin: Optional stdin source (e.g. subprocess.PIPE)
+        stdout: Optional stdout target (e.g. subprocess.PIPE)
+        stderr: Optional stderr target (e.g. subprocess.PIPE)
         
     Returns:
         Popen object for process management
         
     Used for: Long-running processes like tcpdump, eBPF loader, Chrome browser
     """
-    return subprocess.Popen(f"ip netns exec {shlex.quote(ns)} {cmd}", shell=True, env=env, preexec_fn=os.setsid)
+    # New session via start_new_session (handled by subprocess itself, no preexec_fn)
+    return subprocess.Popen(ns_argv(ns, *args), env=env, stdin=stdin, stdout=stdout, stderr=stderr,
+                            start_new_session=True)
+
+def stop_group(proc, grace: float = 1.0):
+    """
+    Stop a process started by run_in_ns together with its children
+    
+    Sends SIGTERM to the process group, and SIGKILL if it is still running
+    after `grace` seconds. The group id is the pid (start_new_session), so no
+    getpgid() lookup is needed, and it stays valid until the leader is reaped.
+    """
+    if proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        try: os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError: pass
+        proc.wait()
+    except ProcessLookupError:
+        pass
 
 # -------------------------- Network Namespace Management --------------------------
 # Functions for cleaning and preparing the isolated network environment
+def ns_pids(ns: str):
+    """
+    PIDs of the processes in network namespace `ns` (what 'ip netns pids' lists)
+    
+    All namespaces share the PID namespace, so pkill run inside one still sees
+    (and would kill) the browsers and captures of the other worker namespaces.
+    """
+    target = os.stat(f"/var/run/netns/{ns}")
+    pids = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            st = os.stat(f"/proc/{name}/ns/net")
+        except OSError:  # exited meanwhile
+            continue
+        if (st.st_dev, st.st_ino) == (target.st_dev, target.st_ino):
+            pids.append(int(name))
+    return pids
+
 def clean_namespace(ns: str):
     """
     Clean the namespace from experiment processes (lightweight with traffic control active)
@@ -112,25 +286,40 @@ def clean_namespace(ns: str):
         "tcpdump.*veth1"         # Previous packet capture sessions on virtual interface
     ]
     
-    # Quick and safe cleanup - use pkill to terminate matching processes
-    # The '|| true' ensures the script continues even if no processes are found
-    for pattern in patterns:
-        ns_sh(ns, f"pkill -f '{pattern}' 2>/dev/null || true")
+    # Match the patterns (like pkill -f) only against the processes of this namespace,
+    # so cleaning one worker namespace never stops another worker's browser or tcpdump
+    regex = re.compile("|".join(patterns))
+    killed = 0
+    for pid in ns_pids(ns):
+        try:
+            cmdline = Path(f"/proc/{pid}/cmdline").read_bytes().replace(b"\0", b" ").decode(errors="replace")
+            if regex.search(cmdline):
+                os.kill(pid, signal.SIGTERM)
+                killed += 1
+        except (OSError, ProcessLookupError):
+            continue
     
     # Short pause for cleanup - allow processes to terminate gracefully
-    time.sleep(0.5)
+    # (only when something matched, otherwise there is nothing to wait for)
+    if killed:
+        time.sleep(0.5)
     print(f"[SUCCESS] Namespace {ns} cleaned")
 
 # -------------------------- Traffic Control (Bandwidth Limiting) --------------------------
 # These functions implement Quality of Service (QoS) to isolate experiment traffic
 # These functions implement Quality of Service (QoS) to isolate experiment traffic
 
-def setup_traffic_control():
+def wan_interface():
+    """Return the host interface of the route to the internet (1.1.1.1), or '' if none"""
+    m = re.search(r"\bdev (\S+)", sh_out("ip", "route", "get", "1.1.1.1").stdout)
+    return m.group(1) if m else ""
+
+def setup_traffic_control(num_ns: int = 1):
     """
     Setup traffic control to isolate experiment traffic from host interference
     
     This function creates a hierarchical traffic control (TC) system that:
-    1. Gives priority to namespace traffic (90% bandwidth)
+    1. Gives priority to namespace traffic (90% bandwidth, split evenly across num_ns namespaces)
     2. Limits host traffic to prevent interference (10% bandwidth)
     3. Uses HTB (Hierarchical Token Bucket) qdisc for fair queuing
     
@@ -139,6 +328,9 @@ def setup_traffic_control():
     - Other applications downloading/uploading can create noise
     - We need consistent baseline conditions for reproducible results
     
+    Args:
+        num_ns: Number of measurement namespaces (10.200.<i>.0/24 subnets, see setup_netns.sh)
+        
     Returns:
         str: WAN interface name if successful, None if failed
     """
@@ -146,7 +338,7 @@ def setup_traffic_control():
     
     # Find main WAN interface - the interface used for internet connectivity
     # This is where we need to apply traffic shaping to control bandwidth usage
-    wan_if = sh("ip route get 1.1.1.1 | awk '/dev/ {print $5; exit}'").stdout.strip()
+    wan_if = wan_interface()
     if not wan_if:
         print("[WARNING] Could not detect WAN interface, skipping traffic control")
         return None
@@ -157,37 +349,39 @@ def setup_traffic_control():
     # This creates a two-tier system:
     # - Priority class for namespace traffic (90% bandwidth allocation)
     # - Limited class for host traffic (10% bandwidth allocation)
+    # Lines are in 'tc -batch' syntax (no leading 'tc'), the whole set goes through one tc process
     commands = [
         # Root qdisc - establishes the traffic control framework
-        f"tc qdisc add dev {wan_if} root handle 1: htb default 30",
+        f"qdisc add dev {wan_if} root handle 1: htb default 30",
         
         # Root class - defines total available bandwidth (100 Mbit baseline)
-        f"tc class add dev {wan_if} parent 1: classid 1:1 htb rate 100mbit",
-        
-        # High priority class for namespace traffic (experiment data)
-        # Rate: 90mbit guaranteed, ceil: 95mbit maximum burst
-        f"tc class add dev {wan_if} parent 1:1 classid 1:10 htb rate 90mbit ceil 95mbit",  
+        f"class add dev {wan_if} parent 1: classid 1:1 htb rate 100mbit",
         
         # Limited class for host traffic (background applications)
         # Rate: 10mbit guaranteed, ceil: 20mbit maximum burst  
-        f"tc class add dev {wan_if} parent 1:1 classid 1:30 htb rate 10mbit ceil 20mbit",  
-        
-        # Filter rules to classify traffic:
-        # Traffic from namespace subnet (10.200.0.0/24) -> high priority class
-        f"tc filter add dev {wan_if} parent 1: protocol ip prio 1 u32 match ip src 10.200.0.0/24 classid 1:10",
+        f"class add dev {wan_if} parent 1:1 classid 1:30 htb rate 10mbit ceil 20mbit",  
         
         # Everything else (host traffic) -> limited class (default via 'default 30')
-        f"tc filter add dev {wan_if} parent 1: protocol ip prio 2 u32 match ip src 0.0.0.0/0 classid 1:30"
+        f"filter add dev {wan_if} parent 1: protocol ip prio 2 u32 match ip src 0.0.0.0/0 classid 1:30"
     ]
-    
-    # Apply each traffic control command
-    for cmd in commands:
-        result = sh(f"sudo {cmd}")
-        if result.returncode != 0:
-            print(f"[ERROR] Traffic control setup failed: {cmd}")
-            print(f"[ERROR] {result.stderr}")
-            cleanup_traffic_control()  # Clean up partial configuration
-            return None
+    for idx in range(num_ns):
+        commands += [
+            # High priority class for namespace traffic (experiment data), one per namespace
+            # Rate: 90mbit guaranteed (shared out between namespaces), ceil: 95mbit maximum burst
+            f"class add dev {wan_if} parent 1:1 classid 1:{10 + idx} htb rate {90000 // num_ns}kbit ceil 95mbit",
+            
+            # Traffic from namespace subnet (10.200.<idx>.0/24) -> its high priority class
+            f"filter add dev {wan_if} parent 1: protocol ip prio 1 u32 match ip src 10.200.{idx}.0/24 classid 1:{10 + idx}",
+        ]
+    
+    # Apply all traffic control commands in a single batch
+    # tc stops at the first failing line and reports its line number on stderr
+    result = sh_check("sudo", "tc", "-batch", "-", input="\n".join(commands) + "\n")
+    if result.returncode != 0:
+        print("[ERROR] Traffic control setup failed")
+        print(f"[ERROR] {result.stderr}")
+        cleanup_traffic_control()  # Clean up partial configuration
+        return None
     
     print("[SUCCESS] Traffic control active - experiment traffic isolated from host")
     return wan_if
@@ -204,17 +398,21 @@ def cleanup_traffic_control():
     - Leftover rules can affect normal system network performance
     - Clean slate ensures no interference with future runs
     """
-    wan_if = sh("ip route get 1.1.1.1 | awk '/dev/ {print $5; exit}'").stdout.strip()
+    wan_if = wan_interface()
     if wan_if:
         print(f"[INFO] Removing traffic control from {wan_if}")
         # Delete root qdisc - this removes the entire hierarchy
-        sh(f"sudo tc qdisc del dev {wan_if} root 2>/dev/null || true")
+        sh_check("sudo", "tc", "qdisc", "del", "dev", wan_if, "root")
         print("[SUCCESS] Traffic control removed")
 
 # -------------------------- Chrome Browser Detection and Management ----------------------------
 # Functions for finding compatible Chrome browser and ChromeDriver versions
 # Functions for finding compatible Chrome browser and ChromeDriver versions
 
+# Major version in "Google Chrome 120.0.6099.71" / "ChromeDriver 120.0.6099.71 (...)"
+VERSION_MAJOR_RE = re.compile(r"\b(\d+)\.")
+
+@lru_cache(maxsize=None)
 def pick_chrome_binary():
     """
     Automatically detect and select the best available Chrome browser binary
@@ -250,6 +448,7 @@ def pick_chrome_binary():
     # Fallback to snap if no other option available
     return "/snap/bin/chromium"
 
+@lru_cache(maxsize=None)
 def get_chrome_major(ns: str, chrome_bin: str):
     """
     Extract the major version number from Chrome browser
@@ -266,10 +465,11 @@ def get_chrome_major(ns: str, chrome_bin: str):
     - Different versions have different QUIC protocol capabilities
     - Version mismatch causes WebDriver to fail completely
     """
-    out = ns_sh(ns, f"{shlex.quote(chrome_bin)} --version || true").stdout.strip()
-    m = re.search(r"\b(\d+)\.", out)
+    out = ns_out(ns, chrome_bin, "--version").stdout.strip()
+    m = VERSION_MAJOR_RE.search(out)
     return int(m.group(1)) if m else None
 
+@lru_cache(maxsize=None)
 def find_chromedriver_for_major(major: int):
     """
     Find ChromeDriver binary matching the specified Chrome major version
@@ -291,50 +491,48 @@ def find_chromedriver_for_major(major: int):
         if os.path.exists(p) and os.access(p, os.X_OK):
             try:
                 # Query ChromeDriver version and check for compatibility
-                out = subprocess.run([p,"--version"], capture_output=True, text=True).stdout
-                m = re.search(r"\b(\d+)\.", out)
+                out = sh_out(p, "--version").stdout
+                m = VERSION_MAJOR_RE.search(out)
                 if int(m.group(1)) == major:
                     return p
             except Exception:
                 pass
     return None
 
-@contextmanager
-def ns_wrapper(target_bin: str, ns: str):
+@lru_cache(maxsize=None)
+def get_ns_wrapper(target_bin: str, ns: str):
     """
-    Create a temporary wrapper script to run Chrome inside a network namespace
+    Get a wrapper script that runs Chrome inside a network namespace
     
-    This context manager creates a shell script that:
-    1. Executes 'ip netns exec' to enter the namespace
-    2. Runs the target binary (Chrome) with all arguments passed through
-    3. Cleans up the wrapper script when done
+    The script just does 'ip netns exec <ns> <chrome> "$@"'. Its content only
+    depends on (target_bin, ns), so it is written once per run into run_dir()
+    and the same path is reused by every Chrome session.
     
     Args:
         target_bin: Path to Chrome binary
         ns: Network namespace name
         
-    Yields:
-        str: Path to the temporary wrapper script
+    Returns:
+        str: Path to the executable wrapper script
         
     Why this is necessary:
     - Selenium WebDriver expects a direct binary path
     - We need Chrome to run inside the network namespace
     - The wrapper transparently bridges this gap
     """
-    # Create temporary file for wrapper script
-    fd, path = tempfile.mkstemp(prefix="nswrap-", suffix=".sh")
+    # (Chrome keeps 'ip netns exec': it needs the namespace's /etc/netns resolv.conf
+    # bind mount, which nsenter --net from ns_argv does not provide)
+    digest = hashlib.sha1(target_bin.encode()).hexdigest()[:8]
+    path = run_dir() / f"nswrap-{ns}-{digest}.sh"
+    # mkstemp (O_EXCL) and rename, so concurrent workers never see a partial script
+    fd, tmp = tempfile.mkstemp(prefix=path.name, dir=run_dir())
     try:
-        # Write wrapper script that executes Chrome in namespace
         os.write(fd, f"#!/bin/sh\nexec ip netns exec {shlex.quote(ns)} {shlex.quote(target_bin)} \"$@\"\n".encode())
-        os.fsync(fd); os.fchmod(fd, 0o755)  # Make executable
+        os.fchmod(fd, 0o755)  # Make executable
     finally:
         os.close(fd)
-    try:
-        yield path
-    finally:
-        # Clean up temporary wrapper script
-        try: os.unlink(path)
-        except Exception: pass
+    os.replace(tmp, path)
+    return str(path)
 
 # -------------------------- QUIC-Only Firewall Rules (Optional) ----------------------
 # Functions to force QUIC protocol usage by blocking TCP/443 connections
@@ -363,12 +561,13 @@ def quic_only_install(ns: str):
     - TCP/443 packets are rejected (forces QUIC usage)
     """
     script = r"""
-add table inet quiconly 2>/dev/null
-add chain inet quiconly out { type filter hook output priority 0; policy accept; } 2>/dev/null
-add rule inet quiconly out udp dport 443 accept 2>/dev/null
-add rule inet quiconly out tcp dport 443 reject 2>/dev/null
+add table inet quiconly
+add chain inet quiconly out { type filter hook output priority 0; policy accept; }
+add rule inet quiconly out udp dport 443 accept
+add rule inet quiconly out tcp dport 443 reject
 """
-    ns_sh(ns, "nft -f - <<'EOF'\n" + script + "EOF")
+    # The ruleset goes to 'nft -f -' on stdin, applied as one transaction
+    ns_check(ns, "nft", "-f", "-", input=script)
 
 def quic_only_uninstall(ns: str):
     """
@@ -380,7 +579,7 @@ def quic_only_uninstall(ns: str):
     This removes the entire 'quiconly' nftables table, restoring
     normal TCP/UDP traffic flow to port 443.
     """
-    ns_sh(ns, "nft delete table inet quiconly 2>/dev/null || true")
+    ns_check(ns, "nft", "delete", "table", "inet", "quiconly")
 
 # -------------------------- eBPF Packet Dropper Management --------------------------------
 # Functions for controlling the eBPF program that drops UDP packets at specified rates
@@ -388,26 +587,52 @@ def quic_only_uninstall(ns: str):
 
 _loader_proc = None  # Global variable to track the eBPF loader process
 
-def set_loader(ns: str, mode: str, ifname: str, *, fixed_prob=None, dyn_max=None, dyn_min_pps=None, dyn_max_pps=None):
+def loader_cmd(mode: str, ifname: str, *, fixed_prob=None, dyn_max=None, dyn_min_pps=None, dyn_max_pps=None,
+               capture=False):
     """
-    Manages start/stop of the eBPF packet dropper based on experiment mode
-    
-    This function controls the eBPF program that simulates network packet loss
-    by dropping UDP packets (targeting QUIC traffic) at specified rates.
+    Build the eBPF loader command line for an experiment mode
     
     Args:
-        ns: Network namespace to run loader in
         mode: Operation mode ('off', 'fixed', 'dynamic')
         ifname: Network interface name to attach eBPF program to
         fixed_prob: Percentage drop rate for 'fixed' mode (0-100)
         dyn_max: Maximum drop percentage for 'dynamic' mode
         dyn_min_pps: Minimum packets/second threshold for dynamic dropping
         dyn_max_pps: Maximum packets/second threshold for dynamic dropping
+        capture: Let the loader also write the pcaps (--capture ebpf)
+        
+    Returns:
+        tuple: Loader argv, empty for 'off' without capture (no loader runs)
         
     Modes explained:
     - 'off': No packet dropping (baseline measurements)
     - 'fixed': Constant drop rate throughout the measurement
     - 'dynamic': Variable drop rate based on current traffic volume
+    """
+    extra = ("--capture",) if capture else ()
+    if mode == "off":
+        # The baseline still needs the loader when it does the capturing, with nothing dropped
+        return (str(LOADER_BIN), ifname, "--mode", "fixed", "--prob", "0") + extra if capture else ()
+    if mode == "fixed":
+        # Fixed mode: constant drop probability throughout measurement
+        return (str(LOADER_BIN), ifname, "--mode", "fixed", "--prob", str(int(fixed_prob))) + extra
+    if mode == "dynamic":
+        # Dynamic mode: drop rate varies based on current packet rate
+        # Higher traffic = higher drop rate (simulates congestion)
+        return (str(LOADER_BIN), ifname, "--mode", "dynamic", "--max-prob", str(int(dyn_max)),
+                "--min-rate", str(int(dyn_min_pps)), "--max-rate", str(int(dyn_max_pps))) + extra
+    raise ValueError(f"Unknown eBPF mode: {mode}")
+
+def set_loader(ns: str, cmd: tuple):
+    """
+    Manages start/stop of the eBPF packet dropper based on experiment mode
+    
+    This function controls the eBPF program that simulates network packet loss
+    by dropping UDP packets (targeting QUIC traffic) at specified rates.
+    
+    Args:
+        ns: Network namespace to run loader in
+        cmd: Loader argv from loader_cmd (empty: just stop the running loader)
     
     Why eBPF for packet dropping:
     - Kernel-level efficiency (no userspace context switching)
@@ -418,51 +643,57 @@ def set_loader(ns: str, mode: str, ifname: str, *, fixed_prob=None, dyn_max=None
     global _loader_proc
     
     # Stop any currently running loader process
-    if _loader_proc and _loader_proc.poll() is None:
-        try:
-            # Send SIGINT first for graceful shutdown
-            os.killpg(os.getpgid(_loader_proc.pid), signal.SIGINT)
-            _loader_proc.wait(timeout=3)
-        except Exception:
-            try: 
-                # Force termination if graceful shutdown fails
-                os.killpg(os.getpgid(_loader_proc.pid), signal.SIGTERM)
-            except Exception: 
-                pass
+    # (SIGTERM first, the loader detaches its programs on it; SIGKILL after 1 s)
+    if _loader_proc:
+        stop_group(_loader_proc)
+        for pipe in (_loader_proc.stdin, _loader_proc.stdout):
+            if pipe:
+                pipe.close()
     _loader_proc = None
     
-    # If mode is 'off', just stop and don't start a new loader
-    if mode == "off":
+    # No command ('off' mode): just stop and don't start a new loader
+    if not cmd:
         return
         
     # Verify eBPF loader binary exists
     if not LOADER_BIN.exists():
         raise SystemExit("ERROR: build the loader first:  (cd ebpf && make)")
     
-    # Construct command line for eBPF loader based on mode
-    if mode == "fixed":
-        # Fixed mode: constant drop probability throughout measurement
-        cmd = f"{shlex.quote(str(LOADER_BIN))} {shlex.quote(ifname)} --mode fixed --prob {int(fixed_prob)}"
-    elif mode == "dynamic":
-        # Dynamic mode: drop rate varies based on current packet rate
-        # Higher traffic = higher drop rate (simulates congestion)
-        cmd = (f"{shlex.quote(str(LOADER_BIN))} {shlex.quote(ifname)} --mode dynamic "
-               f"--max-prob {int(dyn_max)} --min-rate {int(dyn_min_pps)} --max-rate {int(dyn_max_pps)}")
-    else:
-        raise ValueError(f"Unknown eBPF mode: {mode}")
-    
     # Start the eBPF loader process in the network namespace
-    _loader_proc = run_in_ns(ns, cmd)
+    # (with --capture it takes OPEN/CLOSE commands on stdin, see loader_ctl)
+    stdin = subprocess.PIPE if "--capture" in cmd else None
+    _loader_proc = run_in_ns(ns, *cmd, stdin=stdin, stdout=subprocess.PIPE)
     
-    # Give time for eBPF program to attach to interface and initialize
-    time.sleep(3)  
+    # Wait (up to 3 s) for the loader to print READY once its programs are attached
+    # and the map is initialised; if it dies instead, stdout hits EOF right away
+    ready, _, _ = select.select([_loader_proc.stdout], [], [], 3.0)
+    line = _loader_proc.stdout.readline() if ready else b""
     
     # Verify that loader process started successfully
-    if _loader_proc.poll() is not None:
+    if line.strip() != b"READY":
         raise SystemExit(f"[ERROR] Loader process failed to start (exit code: {_loader_proc.poll()})")
 
 # Register cleanup function to stop eBPF loader on script exit
-atexit.register(lambda: set_loader(NS_DEFAULT, "off", "lo"))
+atexit.register(lambda: set_loader(NS_DEFAULT, ()))
+
+def loader_ctl(line: str):
+    """
+    Send one control command to a loader started with --capture and wait for its reply
+    
+    The loader answers CLOSE only after its final ring buffer drain, so waiting here is
+    the barrier that keeps a navigation's packets out of the next OPEN'd pcap.
+    
+    Args:
+        line: "OPEN <pcap path>" or "CLOSE"
+    """
+    if not (_loader_proc and _loader_proc.stdin):
+        raise RuntimeError("eBPF capture needs a loader started with --capture")
+    _loader_proc.stdin.write(line.encode() + b"\n")
+    _loader_proc.stdin.flush()
+    ready, _, _ = select.select([_loader_proc.stdout], [], [], 5.0)
+    reply = _loader_proc.stdout.readline() if ready else b""
+    if reply.strip() != b"OK":
+        raise RuntimeError(f"eBPF loader did not accept '{line}': {reply.strip().decode() or 'no reply'}")
 
 # -------------------------- Network Diagnostics and Interface Detection --------------------------------
 # Functions for network troubleshooting and automatic interface discovery
@@ -488,14 +719,27 @@ def autodetect_iface(ns: str):
     - The eBPF program needs to attach to the correct interface
     - Manual configuration is error-prone
     """
-    # Try to get interface from default route (most reliable method)
-    p = ns_sh(ns, "ip -o -4 route show default | awk '{print $5}'")
-    if p.returncode == 0 and p.stdout.strip():
-        return p.stdout.strip()
+    # One netlink session for links and routes instead of 'ip route' / 'ip link' subprocesses
+    with in_ns(ns), IPRoute() as ipr:
+        links = ipr.get_links()
+        routes = ipr.get_routes(family=socket.AF_INET, table=254)
+    names = {l["index"]: l.get_attr("IFLA_IFNAME") for l in links}
     
-    # Fallback: get first non-loopback interface
-    p = ns_sh(ns, "ip -o link show | awk -F': ' '$2!~/lo/ {print $2; exit}'")
-    return p.stdout.strip() or "eth0"
+    # Try to get interface from default route (most reliable method)
+    for r in routes:
+        if r["dst_len"] == 0 and r.get_attr("RTA_OIF") in names:
+            return names[r.get_attr("RTA_OIF")]
+    
+    # Fallback: first non-loopback interface
+    for idx in sorted(names):
+        if names[idx] != "lo":
+            return names[idx]
+    return "eth0"
+
+def udp_sockets(ds):
+    """UDP sockets of both address families from a bound DiagSocket (what 'ss -u' lists)"""
+    return [sk for family in (socket.AF_INET, socket.AF_INET6)
+            for sk in ds.get_sock_stats(family=family, protocol=socket.IPPROTO_UDP)]
 
 def ns_has_udp443(ns: str):
     """
@@ -509,7 +753,11 @@ def ns_has_udp443(ns: str):
         
     Used for: Verifying that QUIC traffic is actually being generated
     """
-    return bool(ns_sh(ns, "ss -u -n | awk '$5 ~ /:443$/'").stdout.strip())
+    # sock_diag over netlink instead of parsing 'ss' output
+    with in_ns(ns), DiagSocket() as ds:
+        ds.bind()
+        socks = udp_sockets(ds)
+    return any(sk["idiag_dport"] == 443 for sk in socks)
 
 def ns_diag(ns: str):
     """
@@ -526,37 +774,80 @@ def ns_diag(ns: str):
     
     Used for: Troubleshooting network connectivity and configuration issues
     """
-    print("[diag] ip -br link:\n" + ns_sh(ns, "ip -br link").stdout, end="")
-    print("[diag] ip -4 route:\n" + ns_sh(ns, "ip -4 route").stdout, end="")
-    print("[diag] ss -u -n | head:\n" + ns_sh(ns, "ss -u -n | head -n 20").stdout, end="")
-    print("[diag] nft quiconly:\n" + ns_sh(ns, "nft list ruleset | sed -n '/table inet quiconly/,$p'").stdout, end="")
+    # Links, routes and UDP sockets straight from netlink (no ip/ss subprocesses)
+    with in_ns(ns), IPRoute() as ipr, DiagSocket() as ds:
+        links = ipr.get_links()
+        routes = ipr.get_routes(family=socket.AF_INET, table=254)  # main table, like "ip -4 route"
+        ds.bind()
+        socks = udp_sockets(ds)
+    names = {l["index"]: l.get_attr("IFLA_IFNAME") for l in links}
+
+    print("[diag] links:")
+    for l in links:
+        print(f"  {l.get_attr('IFLA_IFNAME'):<16} {l.get_attr('IFLA_OPERSTATE'):<8} {l.get_attr('IFLA_ADDRESS') or ''}")
+    print("[diag] ipv4 routes:")
+    for r in routes:
+        dst = f"{r.get_attr('RTA_DST')}/{r['dst_len']}" if r.get_attr("RTA_DST") else "default"
+        via = f" via {r.get_attr('RTA_GATEWAY')}" if r.get_attr("RTA_GATEWAY") else ""
+        print(f"  {dst}{via} dev {names.get(r.get_attr('RTA_OIF'), '?')}")
+    print("[diag] udp sockets (first 20):")
+    for sk in socks[:20]:
+        print(f"  {sk['idiag_src']}:{sk['idiag_sport']} -> {sk['idiag_dst']}:{sk['idiag_dport']}")
+    # nftables has no netlink wrapper here, this stays a single shell call
+    nft = ns_out(ns, "nft", "list", "table", "inet", "quiconly")
+    print("[diag] nft quiconly:\n" + nft.stdout + nft.stderr, end="")
 
 # -------------------------- Web Navigation and Performance Measurement -----------------------
 # Core functions for automated browser testing and performance data collection
 # Core functions for automated browser testing and performance data collection
 
-def measure_nav(ns: str, chrome_bin: str, url: str, headless: bool):
+# In-page waits for measure_nav, run through execute_async_script so the browser
+# signals completion instead of being polled over the WebDriver connection
+WAIT_LOAD_JS = """
+const done = arguments[arguments.length - 1];
+if (document.readyState === "complete") done();
+else addEventListener("load", () => done(), {once: true});
+"""
+
+# arguments: idle window (ms), hard cap (ms)
+WAIT_NET_IDLE_JS = """
+const [idleMs, capMs, done] = arguments;
+const start = performance.now();
+let last = start;
+const obs = new PerformanceObserver(() => { last = performance.now(); });
+obs.observe({type: "resource"});
+(function check() {
+    const now = performance.now();
+    if (now - last >= idleMs || now - start >= capMs) { obs.disconnect(); done(); }
+    else setTimeout(check, 50);
+})();
+"""
+
+@contextmanager
+def chrome_session(ns: str, chrome_bin: str, headless: bool, reuse_profile: bool = False,
+                   idle_cap_ms: int = 5000):
     """
-    Perform a single web page navigation measurement using Selenium WebDriver
-    
-    This function:
-    1. Starts Chrome browser with optimized settings for QUIC measurements
-    2. Navigates to the target URL
-    3. Waits for page load completion
-    4. Extracts performance timing metrics
-    5. Returns timing data
+    Start one Chrome + ChromeDriver inside the namespace for a whole sweep
     
     Args:
         ns: Network namespace to run Chrome in
         chrome_bin: Path to Chrome binary
-        url: Target website URL to measure
         headless: Whether to run Chrome in headless mode
+        reuse_profile: Seed the profile from / leave it as the run's profile template
+                       (parallel shards, which start many sessions)
+        idle_cap_ms: Network-idle cap measure_nav will use; the script timeout is raised
+                     above it so the in-page wait itself can't time out
         
-    Returns:
-        dict: Performance metrics including:
-            - plt_ms: Page Load Time in milliseconds
-            - t_wall_start: Wall clock start time
-            - t_wall_end: Wall clock end time
+    Yields:
+        webdriver.Chrome: Driver shared by all measure_nav calls
+        
+    Why one browser for all navigations:
+    - Chrome cold start (process launch, profile creation) costs seconds per URL
+      and has nothing to do with what we measure
+    - With --workers (one session per shard) later sessions start from a copy of
+      the first session's profile instead of an empty directory
+    - Each navigation still gets a fresh browser context (see measure_nav),
+      with its own cache, cookies and connections
     
     Key Chrome optimizations for measurements:
     - Disables caching to ensure fresh loads
@@ -565,10 +856,6 @@ def measure_nav(ns: str, chrome_bin: str, url: str, headless: bool):
     - Uses incognito mode for clean state
     - Extended timeout for packet loss scenarios
     """
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.chrome.service import Service
-
     # Verify Chrome version compatibility with ChromeDriver
     major = get_chrome_major(ns, chrome_bin)
     if not major:
@@ -577,77 +864,148 @@ def measure_nav(ns: str, chrome_bin: str, url: str, headless: bool):
     if not cdrv:
         raise SystemExit(f"chromedriver {major}.x not found. Install one aligned with Chrome {major}.x")
 
-    # Create namespace wrapper for Chrome binary
-    with ns_wrapper(chrome_bin, ns) as chrome_in_ns:
-        opts = Options()
-        
-        # Essential Chrome flags for measurement accuracy
-        for a in ("--no-first-run","--disable-extensions","--disable-background-networking",
-                  "--disable-sync","--incognito","--disk-cache-size=1",
-                  "--disable-application-cache","--disable-back-forward-cache",
-                  "--disable-background-timer-throttling","--disable-renderer-backgrounding",
-                  "--disable-features=TranslateUI,BlinkGenPropertyTrees",
-                  # QUIC protocol enablement
-                  "--enable-quic","--enable-features=UseDnsHttpsSvcb,UseDnsHttpsSvcbAlpn",
-                  # Namespace compatibility
-                  "--no-sandbox","--disable-dev-shm-usage","--remote-debugging-pipe"):
-            opts.add_argument(a)
-            
-        # Configure headless mode if requested
-        if headless:
-            opts.add_argument("--headless=new")
-            opts.add_argument("--hide-scrollbars") 
-            opts.add_argument("--disable-gpu")
-            
-        # Create isolated Chrome profile for this measurement
-        profile = tempfile.mkdtemp(prefix="chrome-prof-")
-        opts.add_argument(f"--user-data-dir={profile}")
-        opts.binary_location = chrome_in_ns
+    # Namespace wrapper for the Chrome binary (written once per run, see get_ns_wrapper)
+    chrome_in_ns = get_ns_wrapper(chrome_bin, ns)
+    opts = Options()
+    
+    # Essential Chrome flags for measurement accuracy
+    for a in ("--no-first-run","--disable-extensions","--disable-background-networking",
+              "--disable-sync","--incognito","--disk-cache-size=1",
+              "--disable-application-cache","--disable-back-forward-cache",
+              "--disable-background-timer-throttling","--disable-renderer-backgrounding",
+              "--disable-features=TranslateUI,BlinkGenPropertyTrees",
+              # QUIC protocol enablement
+              "--enable-quic","--enable-features=UseDnsHttpsSvcb,UseDnsHttpsSvcbAlpn",
+              # Namespace compatibility
+              "--no-sandbox","--disable-dev-shm-usage","--remote-debugging-pipe"):
+        opts.add_argument(a)
+        
+    # Configure headless mode if requested
+    if headless:
+        opts.add_argument("--headless=new")
+        opts.add_argument("--hide-scrollbars") 
+        opts.add_argument("--disable-gpu")
         
-        # Initialize WebDriver with configured options
-        drv = webdriver.Chrome(service=Service(executable_path=cdrv), options=opts)
+    # Create isolated Chrome profile for this session, seeded from the template when
+    # an earlier session left one (saves Chrome writing Local State, Preferences, ...).
+    # The template sits in the private run_dir(), so whatever is there was put there by us.
+    template = run_dir() / "chrome-template"
+    profile = tempfile.mkdtemp(prefix="chrome-prof-", dir=run_dir())
+    if reuse_profile and template.is_dir():
+        sh_check("cp", "-a", "--reflink=auto", f"{template}/.", profile)
+    opts.add_argument(f"--user-data-dir={profile}")
+    opts.binary_location = chrome_in_ns
+    
+    # Initialize WebDriver with configured options
+    drv = webdriver.Chrome(service=Service(executable_path=cdrv), options=opts)
 
-        try:
-            # Extended timeout for packet loss scenarios (was 45s, now 120s)
-            drv.set_page_load_timeout(120)
-            
-            # Force disable caching through DevTools Protocol
-            # This ensures we measure actual network performance, not cache hits
-            drv.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
-            drv.execute_cdp_cmd('Network.clearBrowserCache', {})
-            
-            # Record start time and navigate to target URL
-            t0 = time.time()
-            drv.get(url)
-            
-            # Wait for page to fully load (check every 100ms for up to 45 seconds)
-            for _ in range(450):
-                if drv.execute_script("return document.readyState") == "complete":
-                    break
-                time.sleep(0.1)
-            
-            # Extract navigation timing data from browser's Performance API
-            nav = drv.execute_script("return performance.getEntriesByType('navigation')[0] || {}")
-            
-            # Calculate Page Load Time from navigation timing
-            plt_ms = (nav.get("loadEventEnd", 0) - nav.get("startTime", 0)) or 0
-            
-            # Brief pause to ensure all network activity completes
-            time.sleep(5)
-            
-            return {"plt_ms": plt_ms, "t_wall_start": t0, "t_wall_end": time.time()}
-            
-        except KeyboardInterrupt:
-            print(f"[INFO] Navigation interrupted by user for {url}")
-            return {"plt_ms": 0, "t_wall_start": t0, "t_wall_end": time.time()}
-        except Exception as e:
-            print(f"[ERROR] Navigation failed for {url}: {e}")
-            return {"plt_ms": 0, "t_wall_start": t0, "t_wall_end": time.time()}
-        finally:
-            # Cleanup: close browser and remove temporary profile
-            drv.quit()
+    try:
+        # Extended timeout for packet loss scenarios (was 45s, now 120s)
+        drv.set_page_load_timeout(120)
+        # Upper bound for the in-page waits in measure_nav (load event, network idle)
+        drv.set_script_timeout(max(45, idle_cap_ms / 1000 + 5))
+        yield drv
+    finally:
+        # Cleanup: close browser, then keep the first profile as template (parallel runs
+        # only) and remove the others. Navigations ran in their own browser contexts, so
+        # the profile holds no site state; only the saved session is dropped so it can't
+        # be restored. The template goes away with run_dir() when the main process exits.
+        drv.quit()
+        kept = False
+        if reuse_profile and not template.exists():
+            shutil.rmtree(Path(profile) / "Default" / "Sessions", ignore_errors=True)
+            try:
+                os.rename(profile, template)  # atomic, the first session to finish wins
+                kept = True
+            except OSError:
+                pass
+        if not kept:
             shutil.rmtree(profile, ignore_errors=True)
 
+def measure_nav(drv, url: str, idle_cap_ms: int = 5000):
+    """
+    Perform a single web page navigation measurement using Selenium WebDriver
+    
+    This function:
+    1. Opens a new tab in a fresh browser context (own cache, cookies, connections)
+    2. Navigates to the target URL
+    3. Waits for page load completion
+    4. Extracts performance timing metrics
+    5. Disposes of the browser context and returns timing data
+    
+    Args:
+        drv: Driver from chrome_session
+        url: Target website URL to measure
+        idle_cap_ms: Upper bound of the trailing network-idle wait (0: no wait)
+        
+    Returns:
+        dict: Performance metrics including:
+            - plt_ms: Page Load Time in milliseconds
+            - t_wall_start: Wall clock start time
+            - t_wall_end: Wall clock end time
+    """
+    t0 = time.time()
+    main_window = ctx = None
+    try:
+        # Inside the try: a crashed browser costs this URL, not the whole sweep
+        main_window = drv.current_window_handle
+        
+        # New browser context + tab; ChromeDriver uses the CDP target id as window handle
+        ctx = drv.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+        tab = drv.execute_cdp_cmd("Target.createTarget", {"url": "about:blank", "browserContextId": ctx})["targetId"]
+        drv.switch_to.window(tab)
+        
+        # Force disable caching through DevTools Protocol
+        # This ensures we measure actual network performance, not cache hits
+        drv.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+        drv.execute_cdp_cmd('Network.clearBrowserCache', {})
+        
+        # Record start time and navigate to target URL
+        t0 = time.time()
+        drv.get(url)
+        
+        # Wait for page to fully load (bounded by the driver's script timeout, see
+        # set_script_timeout in chrome_session) with a single in-page wait on the
+        # load event instead of polling readyState over the driver
+        try:
+            drv.execute_async_script(WAIT_LOAD_JS)
+        except TimeoutException:
+            pass
+        
+        # Extract navigation timing data from browser's Performance API
+        nav = drv.execute_script("return performance.getEntriesByType('navigation')[0] || {}")
+        
+        # Calculate Page Load Time from navigation timing
+        plt_ms = (nav.get("loadEventEnd", 0) - nav.get("startTime", 0)) or 0
+        
+        # Let trailing network activity complete: wait until no resource has
+        # finished for 500 ms, capped at idle_cap_ms (default: the 5 s the old fixed pause used)
+        # Best effort: a script timeout or a JS redirect/reload after load ("document
+        # unloaded while waiting for result") must not throw away the measured PLT
+        if idle_cap_ms > 0:
+            try:
+                drv.execute_async_script(WAIT_NET_IDLE_JS, 500, idle_cap_ms)
+            except WebDriverException:
+                pass
+        
+        return {"plt_ms": plt_ms, "t_wall_start": t0, "t_wall_end": time.time()}
+        
+    except KeyboardInterrupt:
+        print(f"[INFO] Navigation interrupted by user for {url}")
+        return {"plt_ms": 0, "t_wall_start": t0, "t_wall_end": time.time()}
+    except Exception as e:
+        print(f"[ERROR] Navigation failed for {url}: {e}")
+        return {"plt_ms": 0, "t_wall_start": t0, "t_wall_end": time.time()}
+    finally:
+        # Cleanup: drop the context (closes its tab and connections), back to the main window
+        try:
+            if main_window:
+                drv.switch_to.window(main_window)
+            if ctx:
+                drv.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": ctx})
+        except Exception:
+            pass
+
 @contextmanager
 def tcpdump_veth1(ns: str, outfile: Path, bpf: str):
     """
@@ -672,27 +1030,136 @@ def tcpdump_veth1(ns: str, outfile: Path, bpf: str):
     # Start tcpdump process in the namespace
     # -i veth1: capture on virtual interface
     # -w: write to file
-    # -U: packet-buffered output (immediate write)
+    # -s 128: headers only (Ethernet+IP+UDP+QUIC header), analysis uses the wire length
+    # -B 4096: 4 MiB kernel capture buffer
+    # no -U: let libpcap batch writes instead of one write() per packet;
+    #        tcpdump flushes the buffer when it is stopped
     # -n: don't resolve hostnames (faster)
-    proc = run_in_ns(ns, f"tcpdump -i veth1 -w {shlex.quote(str(outfile))} -U -n {shlex.quote(bpf)}")
-    
-    # Brief delay to ensure tcpdump is ready
-    time.sleep(0.6)
+    proc = run_in_ns(ns, "tcpdump", "-i", "veth1", "-w", str(outfile), "-s", "128", "-B", "4096", "-n", bpf,
+                     stderr=subprocess.PIPE)
+    
+    # Wait (up to 2 s) until tcpdump reports "listening on veth1, ..." on stderr, which it
+    # does once the capture is active and the filter attached. (The pcap file can't be
+    # used for this: without -U even its header stays in tcpdump's buffer.)
+    # Raw os.read() so that select() sees everything that hasn't been consumed yet.
+    deadline = time.monotonic() + 2.0
+    err = b""
+    while b"listening on" not in err:
+        ready, _, _ = select.select([proc.stderr], [], [], max(0.0, deadline - time.monotonic()))
+        chunk = os.read(proc.stderr.fileno(), 4096) if ready else b""
+        if not chunk:  # timeout, or tcpdump exited
+            print(f"[warn] tcpdump not ready for {outfile.name} (exit code: {proc.poll()}): "
+                  f"{err.decode(errors='replace').strip()}")
+            break
+        err += chunk
     
     try:
         yield  # Allow navigation to proceed
     finally:
-        # Stop tcpdump gracefully
-        try: 
-            os.killpg(os.getpgid(proc.pid), signal.SIGINT)
-        except Exception: 
-            pass
-        try: 
-            proc.wait(timeout=5)
-        except Exception: 
-            pass
+        # Stop tcpdump gracefully: it flushes and closes the pcap on SIGTERM like on SIGINT
+        # (its final statistics fit in the stderr pipe, nobody reads them). Without -U the
+        # whole capture may still be in its buffer, so give it time to write before SIGKILL.
+        stop_group(proc, grace=5.0)
+        proc.stderr.close()
+
+@contextmanager
+def ebpf_capture(outfile: Path):
+    """
+    Context manager for packet capture by the eBPF loader (--capture ebpf)
+    
+    The loader's programs mirror UDP/443 packets into a ring buffer and the loader
+    writes them to outfile, so no tcpdump process is started per navigation.
+    Only packets that survive the dropper are recorded, as with tcpdump.
+    Records from different CPUs may be slightly out of timestamp order in the
+    file; analyse_pcaps.py sorts them.
+    """
+    loader_ctl(f"OPEN {outfile.resolve()}")
+    try:
+        yield
+    finally:
+        loader_ctl("CLOSE")
+
+SNAPLEN = 128           # Bytes kept per packet, as with tcpdump -s 128
+ETH_P_ALL = 0x0003
+SO_ATTACH_FILTER = 26   # Not exported by the socket module
+SO_TIMESTAMPNS = 35
 
-def capture_one(ns: str, url: str, tag: str, headless: bool, chrome_bin: str):
+@lru_cache(maxsize=None)
+def compiled_filter(ns: str, bpf: str):
+    """
+    Compile a capture filter to classic BPF once, with tcpdump -ddd on veth1
+    
+    Returns:
+        bytes: The sock_filter array ({u16 code; u8 jt; u8 jf; u32 k} per instruction)
+    """
+    out = ns_out(ns, "tcpdump", "-i", "veth1", "-ddd", bpf)
+    if out.returncode != 0:
+        raise SystemExit(f"[ERROR] tcpdump could not compile '{bpf}': {out.stderr.strip()}")
+    # First line: instruction count, then one "code jt jf k" line per instruction
+    lines = out.stdout.strip().splitlines()
+    insns = [tuple(int(x) for x in line.split()) for line in lines[1:]]
+    if not lines or len(insns) != int(lines[0]):
+        raise SystemExit(f"[ERROR] Unexpected tcpdump -ddd output for '{bpf}'")
+    return b"".join(struct.pack("HBBI", *i) for i in insns)
+
+@contextmanager
+def socket_capture(ns: str, outfile: Path, bpf: str):
+    """
+    Context manager for packet capture without tcpdump (--capture socket)
+    
+    Captures on an AF_PACKET socket bound to veth1 in the namespace, with the
+    filter compiled once per run (compiled_filter) and attached in the kernel,
+    so per navigation there is no process to start and no filter to compile.
+    A thread writes the packets (first SNAPLEN bytes, nanosecond timestamps)
+    to a pcap file like tcpdump -s 128 would.
+    """
+    insns = compiled_filter(ns, bpf)
+    with in_ns(ns):
+        # Protocol 0 receives nothing until bind(), so no packet gets past without the filter
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+    # Socket and file are closed on every path, including a failing setsockopt()/bind()
+    with sock, open(outfile, "wb", buffering=64 * 1024) as f:
+        prog = ctypes.create_string_buffer(insns)
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER,
+                        struct.pack("HL", len(insns) // 8, ctypes.addressof(prog)))
+        sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        sock.bind(("veth1", ETH_P_ALL))
+        
+        stop = threading.Event()
+        # Classic pcap, nanosecond variant, Ethernet link type
+        f.write(struct.pack("IHHiIII", 0xa1b23c4d, 2, 4, 0, 0, SNAPLEN, 1))
+        
+        def reader():
+            buf = bytearray(SNAPLEN)
+            anc = socket.CMSG_SPACE(16)
+            sock.settimeout(0.1)
+            while True:
+                try:
+                    # MSG_TRUNC: n is the full packet length even though only SNAPLEN bytes are copied
+                    n, cmsgs, _, _ = sock.recvmsg_into([buf], anc, socket.MSG_TRUNC)
+                except socket.timeout:
+                    if stop.is_set():
+                        break
+                    continue
+                except BlockingIOError:
+                    break  # drained after stop
+                sec, nsec = struct.unpack("qq", cmsgs[0][2]) if cmsgs else divmod(time.time_ns(), 10**9)
+                cap = min(n, SNAPLEN)
+                f.write(struct.pack("IIII", sec, nsec, cap, n))
+                f.write(buf[:cap])
+                if stop.is_set():
+                    sock.setblocking(False)
+        
+        t = threading.Thread(target=reader, daemon=True)
+        t.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            t.join()
+
+def capture_one(ns: str, url: str, tag: str, drv, capture: str = "tcpdump", idle_cap_ms: int = 5000):
     """
     Perform one complete measurement: navigation + packet capture
     
@@ -700,14 +1167,16 @@ def capture_one(ns: str, url: str, tag: str, headless: bool, chrome_bin: str):
         ns: Network namespace
         url: Website URL to test
         tag: Unique identifier for this measurement
-        headless: Chrome headless mode flag
-        chrome_bin: Chrome binary path
+        drv: Driver from chrome_session
+        capture: Packet capture backend, 'tcpdump', 'ebpf' (the loader's ring buffer)
+                 or 'socket' (AF_PACKET socket, see socket_capture)
+        idle_cap_ms: Cap of the post-load network-idle wait (see measure_nav)
         
     Returns:
         tuple: (pcap_path, navigation_metrics)
         
     This function combines:
-    - Packet capture (tcpdump for UDP/QUIC traffic)
+    - Packet capture (tcpdump or the eBPF loader, UDP/QUIC traffic)
     - Web navigation (Selenium/Chrome)
     - Basic capture validation
     
@@ -718,28 +1187,201 @@ def capture_one(ns: str, url: str, tag: str, headless: bool, chrome_bin: str):
     nav = {}
     
     # Perform navigation with simultaneous packet capture
-    with tcpdump_veth1(ns, pcap, "udp and port 443"):
-        nav = measure_nav(ns, chrome_bin, url, headless)
+    if capture == "ebpf":
+        capturing = ebpf_capture(pcap)
+    elif capture == "socket":
+        capturing = socket_capture(ns, pcap, "udp and port 443")
+    else:
+        capturing = tcpdump_veth1(ns, pcap, "udp and port 443")
+    with capturing:
+        nav = measure_nav(drv, url, idle_cap_ms)
+
+    # The pcap is validated later with the rest of its repetition (check_pcaps)
+    return str(pcap), nav or {"plt_ms":0,"t_wall_start":0,"t_wall_end":0}
 
-    # Validate that we captured some packets
+SUSPICIOUS_PKTS = 10  # Fewer captured packets than this: the page hardly used QUIC
+
+# Classic pcap magics (microsecond/nanosecond) -> struct byte order of the file
+PCAP_BYTE_ORDER = {b"\xd4\xc3\xb2\xa1": "<", b"\xa1\xb2\xc3\xd4": ">",
+                   b"\x4d\x3c\xb2\xa1": "<", b"\xa1\xb2\x3c\x4d": ">"}
+
+def count_pcap_packets(path: str):
+    """
+    Count the records of a classic pcap file by walking its record headers
+    
+    Returns:
+        int: Number of complete records, or None when the file is missing or not
+        a classic pcap (e.g. pcapng)
+    """
     try:
-        # Use capinfos to count packets in capture file
-        ci = ns_sh(ns, f"capinfos -c {shlex.quote(str(pcap))} 2>/dev/null | awk -F': ' '/Number of packets/ {{print $2}}'").stdout.strip()
-        pkt = int(ci) if ci.isdigit() else (pcap.stat().st_size > 24)
-    except Exception:
-        # Fallback: check if file is larger than pcap header (24 bytes)
-        pkt = (pcap.stat().st_size > 24)
+        with open(path, "rb") as pf:
+            data = pf.read()
+    except OSError:
+        return None
+    order = PCAP_BYTE_ORDER.get(data[:4])
+    if order is None:
+        return None
+    # 24-byte global header, then 16-byte record headers (ts_sec, ts_frac, incl_len, orig_len)
+    incl_len = struct.Struct(order + "I")
+    n, off = 0, 24
+    while off + 16 <= len(data):
+        off += 16 + incl_len.unpack_from(data, off + 8)[0]
+        if off > len(data):
+            break  # truncated last record (capture interrupted)
+        n += 1
+    return n
 
-    # Warn if no packets captured (site may not use QUIC)
-    if not pkt:
-        print(f"[warn] empty pcap for {url}. The site may not use QUIC.")
+def check_pcaps(rows: list):
+    """
+    Validate the captures of a batch of nav_metrics rows
+    
+    Args:
+        rows: Rows from measure_url (uses their 'pcap' and 'url' columns)
         
-    return str(pcap), nav or {"plt_ms":0,"t_wall_start":0,"t_wall_end":0}
+    Packets are counted in-process (count_pcap_packets), no process per file.
+    Pcaps with no or very few packets are reported in one summary instead of
+    aborting the run; usually the site did not use QUIC.
+    """
+    low = []
+    for r in rows:
+        pkt = count_pcap_packets(r["pcap"])
+        if pkt is None:
+            # Unreadable or unknown format: anything beyond the 24-byte pcap header counts as fine
+            pkt = SUSPICIOUS_PKTS if os.path.exists(r["pcap"]) and os.path.getsize(r["pcap"]) > 24 else 0
+        if pkt < SUSPICIOUS_PKTS:
+            low.append((pkt, r["url"]))
+    if low:
+        print(f"[warn] {len(low)}/{len(rows)} pcaps with fewer than {SUSPICIOUS_PKTS} packets "
+              f"(the site may not use QUIC):")
+        for pkt, url in low:
+            print(f"  {pkt:>3}  {url}")
+
+# -------------------------- Run Plans ---------------------------------------
+# One RunPlan per drop configuration of a sweep, built once before any navigation
+
+@dataclass(frozen=True)
+class RunPlan:
+    """
+    Everything that stays constant while one drop configuration is measured
+    
+    Attributes:
+        title: Progress/log label (e.g. "fixed 5%")
+        tag_prefix: Prefix of the pcap tags (e.g. "lvl5")
+        loader_cmd: eBPF loader argv, empty when no loader is needed
+        row: Fixed columns of the nav_metrics rows (mode, level, dynamic parameters)
+        capture: Packet capture backend ('tcpdump', 'ebpf' or 'socket')
+        idle_cap_ms: Cap of the post-load network-idle wait per navigation
+    """
+    title: str
+    tag_prefix: str
+    loader_cmd: tuple
+    row: dict
+    capture: str = "tcpdump"
+    idle_cap_ms: int = 5000
+
+def build_plans(args, ifname: str):
+    """
+    Expand the command-line configuration into the list of RunPlans to execute
+    
+    Experiment modes:
+    - 'off': one plan, baseline without packet dropping
+    - 'fixed': one plan per drop level in --levels
+    - 'dynamic': one plan with the adaptive dropper
+    """
+    no_dyn = {"dyn_max_prob": "", "dyn_min_pps": "", "dyn_max_pps": ""}
+    cap = args.capture == "ebpf"
+    common = {"capture": args.capture, "idle_cap_ms": args.idle_cap_ms}
+    if args.mode == "off":
+        return [RunPlan("baseline", "off", loader_cmd("off", ifname, capture=cap),
+                        {"mode": "off", "level": 0, "dropper": "none", **no_dyn}, **common)]
+    if args.mode == "fixed":
+        levels = [int(x) for x in args.levels.split(",") if x.strip()]
+        return [RunPlan(f"fixed {lvl}%", f"lvl{lvl}", loader_cmd("fixed", ifname, fixed_prob=lvl, capture=cap),
+                        {"mode": "fixed", "level": lvl, "dropper": DROPPER_HOOK, **no_dyn}, **common)
+                for lvl in levels]
+    return [RunPlan("dynamic", "dyn",
+                    loader_cmd("dynamic", ifname, dyn_max=args.dynamic_max_prob,
+                               dyn_min_pps=args.dynamic_min_pps, dyn_max_pps=args.dynamic_max_pps, capture=cap),
+                    {"mode": "dynamic", "level": -1, "dropper": DROPPER_HOOK, "dyn_max_prob": args.dynamic_max_prob,
+                     "dyn_min_pps": args.dynamic_min_pps, "dyn_max_pps": args.dynamic_max_pps},
+                    **common)]
+
+def build_url_orders(urls: list, n_plans: int, runs: int, seed: int = 123):
+    """
+    Draw the URL order of every repetition of every plan before measuring
+    
+    Randomized order minimizes ordering effects; a private seeded generator
+    makes it reproducible and independent of anything else using `random`.
+    Each order is a reshuffle of the previous one, the same sequence the
+    former in-loop random.seed(123) + random.shuffle(urls) produced.
+    
+    Returns:
+        list: Per plan, a list of per-repetition URL tuples
+    """
+    rng = random.Random(seed)
+    order = list(urls)
+    orders = []
+    for _ in range(n_plans):
+        plan_orders = []
+        for _ in range(runs):
+            rng.shuffle(order)
+            plan_orders.append(tuple(order))
+        orders.append(plan_orders)
+    return orders
+
+# pcap names: the start of the run (once, inherited by pool workers) plus the pid and a
+# per-process sequence number (forked workers all inherit the counter at the same value);
+# the wall clock of each navigation is in the CSV (t_wall_start)
+RUN_STAMP = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+_tag_seq = itertools.count()
+
+@lru_cache(maxsize=None)
+def url_slug(url: str):
+    """File-name form of a URL ("https://a.org/x" -> "https_a.org_x"), computed once per URL"""
+    return url.replace("://", "_").replace("/", "_")
+
+def measure_url(ns: str, plan: RunPlan, rep: int, url: str, drv):
+    """Measure one URL under a plan and return its nav_metrics row"""
+    # Create unique tag for this measurement
+    tag = f"{plan.tag_prefix}_rep{rep}_{url_slug(url)}_{RUN_STAMP}_{os.getpid()}_{next(_tag_seq):05d}"
+    
+    # Perform measurement and save results with the plan's metadata
+    pcap, nav = capture_one(ns, url, tag, drv, plan.capture, plan.idle_cap_ms)
+    return {**plan.row, "url":url,"rep":rep,"pcap":pcap,
+            "plt_ms":nav["plt_ms"],"t_wall_start":nav["t_wall_start"],"t_wall_end":nav["t_wall_end"]}
+
+def run_shard(ns: str, plan: RunPlan, rep: int, urls: list, chrome_bin: str, headless: bool):
+    """
+    Measure a slice of one repetition in its own namespace (process pool worker for --workers)
+    
+    Each worker namespace has its own veth pair, loader and browser, so shards
+    never share a capture interface or drop program.
+    
+    Returns:
+        list: nav_metrics rows for the URLs of this shard
+    """
+    rows = []
+    set_loader(ns, plan.loader_cmd)
+    try:
+        with chrome_session(ns, chrome_bin, headless, reuse_profile=True, idle_cap_ms=plan.idle_cap_ms) as drv:
+            for url in urls:
+                rows.append(measure_url(ns, plan, rep, url, drv))
+    finally:
+        # Pool workers exit without running atexit handlers, stop the loader here
+        set_loader(ns, ())
+    return rows
 
 # -------------------------- Main Execution Logic ---------------------------------------
 # Command-line interface and experiment orchestration
 # Command-line interface and experiment orchestration
 
+def non_negative_int(value: str):
+    """argparse type for counts and durations that can't be negative"""
+    n = int(value)
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {n}")
+    return n
+
 def main():
     """
     Main function that orchestrates the complete measurement experiment
@@ -790,6 +1432,15 @@ def main():
                         help="Install firewall rules to force QUIC protocol usage")
     parser.add_argument("--traffic-control", action=argparse.BooleanOptionalAction, default=True, 
                         help="Enable traffic control to isolate experiment traffic from host interference")
+    parser.add_argument("--workers", type=int, default=1, choices=range(1, 17), metavar="N",
+                        help="Measure N URLs in parallel, one per namespace NS, NS-1 .. NS-(N-1) "
+                             "(create them with ./setup_netns.sh N)")
+    parser.add_argument("--capture", choices=["tcpdump", "ebpf", "socket"], default="tcpdump",
+                        help="Packet capture backend: a tcpdump per navigation, the eBPF loader's "
+                             "ring buffer (kernel >= 5.8), or an in-process AF_PACKET socket")
+    parser.add_argument("--idle-cap-ms", type=non_negative_int, default=5000, metavar="MS",
+                        help="After the load event, wait for 500 ms without network activity, "
+                             "at most MS milliseconds (0 disables the wait)")
     
     args = parser.parse_args()
 
@@ -798,13 +1449,27 @@ def main():
     # Create output directories for results and packet captures
     OUT_DIR.mkdir(parents=True, exist_ok=True)
     PCAPS_DIR.mkdir(parents=True, exist_ok=True)
+    # Private temp directory, created here so that pool workers inherit it
+    run_dir()
+
+    # Load URL list from file (skip comments and empty lines)
+    urls = [u.strip() for u in open(args.urls) if u.strip() and not u.startswith("#")]
+    
+    # Workers beyond one per URL would never get a shard, don't prepare namespaces for them
+    if args.workers > len(urls) > 0:
+        print(f"[INFO] --workers {args.workers} reduced to {len(urls)} (one per URL)")
+        args.workers = len(urls)
 
+    # One namespace per worker: NS for the first, NS-1 .. NS-(N-1) for the others
+    namespaces = [args.ns] + [f"{args.ns}-{i}" for i in range(1, args.workers)]
+    
     # Verify namespace access permissions early (prevents cryptic errors later)
-    test_ns = subprocess.run(["ip", "netns", "exec", args.ns, "true"], capture_output=True)
-    if test_ns.returncode != 0:
-        raise SystemExit(f"Permission denied to enter namespace '{args.ns}'. "
-                         f"Run: sudo -E ./run_full_evaluation.sh (or start this script with sudo -E). "
-                         f"Details: {test_ns.stderr.decode().strip()}")
+    for ns in namespaces:
+        test_ns = subprocess.run(["ip", "netns", "exec", ns, "true"], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if test_ns.returncode != 0:
+            raise SystemExit(f"Permission denied to enter namespace '{ns}'. "
+                             f"Run: sudo -E ./run_full_evaluation.sh (or start this script with sudo -E). "
+                             f"Details: {test_ns.stderr.decode().strip()}")
 
     # Detect and verify Chrome browser installation
     chrome = pick_chrome_binary()
@@ -812,121 +1477,95 @@ def main():
     # Install QUIC-only firewall rules if requested
     # This forces websites to use QUIC instead of falling back to TCP
     if args.quic_only:
-        quic_only_install(args.ns)
-        atexit.register(lambda: quic_only_uninstall(args.ns))  # Cleanup on exit
+        for ns in namespaces:
+            quic_only_install(ns)
+            atexit.register(quic_only_uninstall, ns)  # Cleanup on exit
 
     # Clean any leftover processes from previous experiments
-    clean_namespace(args.ns)
+    for ns in namespaces:
+        clean_namespace(ns)
     
     # Setup traffic control for experiment isolation (default enabled)
     # This prevents host system traffic from interfering with measurements
     tc_interface = None
     if args.traffic_control:
-        tc_interface = setup_traffic_control()
+        tc_interface = setup_traffic_control(len(namespaces))
         if tc_interface:
             atexit.register(cleanup_traffic_control)  # Cleanup on exit
     
     # Auto-detect network interface for eBPF attachment
     ifname = autodetect_iface(args.ns)
+    # Plans carry one loader command for all workers, so every namespace must use the same name
+    for ns in namespaces[1:]:
+        if autodetect_iface(ns) != ifname:
+            raise SystemExit(f"Namespace {ns} uses interface {autodetect_iface(ns)}, expected {ifname} "
+                             f"(recreate the namespaces with ./setup_netns.sh {args.workers})")
     
     # Print preflight diagnostic information
     print(f"[preflight] ns={args.ns} if={ifname} chrome={chrome} major={get_chrome_major(args.ns, chrome)}")
-    print("[preflight] ping 1.1.1.1 ->", ns_sh(args.ns, "ping -c1 -W1 1.1.1.1 >/dev/null && echo OK || echo FAIL").stdout.strip())
+    print("[preflight] ping 1.1.1.1 ->", "OK" if ns_check(args.ns, "ping", "-c1", "-W1", "1.1.1.1").returncode == 0 else "FAIL")
 
-    # Load URL list from file (skip comments and empty lines)
-    urls = [u.strip() for u in open(args.urls) if u.strip() and not u.startswith("#")]
-    
-    # Set random seed for reproducible URL ordering across runs
-    random.seed(123)
+    # Resolve mode/levels/loader parameters once, outside the measurement loops,
+    # together with the (seeded, reproducible) URL order of every repetition
+    plans = build_plans(args, ifname)
+    url_orders = build_url_orders(urls, len(plans), args.runs_per_level)
 
     # -------------------------- Measurement Execution --------------------------
     
     # Initialize CSV file for results with comprehensive metadata
-    with open(CSV_PATH, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=["mode","level","url","rep","pcap","plt_ms","t_wall_start","t_wall_end",
+    # Sequential runs: one browser serves the whole sweep, each navigation gets its own context
+    # Parallel runs (--workers): a process pool, each shard brings its own browser and loader.
+    # The workers must be forked: they rely on inheriting RUN_STAMP and the run_dir() created above.
+    parallel = args.workers > 1
+    pool_ctx = multiprocessing.get_context("fork")
+    with open(CSV_PATH, "w", newline="", buffering=64*1024) as f, \
+         (ProcessPoolExecutor(max_workers=args.workers, mp_context=pool_ctx) if parallel else nullcontext()) as pool, \
+         (nullcontext() if parallel else chrome_session(args.ns, chrome, args.headless,
+                                                          idle_cap_ms=args.idle_cap_ms)) as drv:
+        w = csv.DictWriter(f, fieldnames=["mode","level","dropper","url","rep","pcap","plt_ms","t_wall_start","t_wall_end",
                                           "dyn_max_prob","dyn_min_pps","dyn_max_pps"])
         w.writeheader()
 
-        # Execute measurements based on selected mode
-        if args.mode == "off":
-            """
-            Baseline Mode: No packet dropping
-            
-            This establishes the reference performance without any network interference.
-            Essential for calculating relative performance degradation in other modes.
-            """
-            print("[INFO] Starting baseline measurements (mode: off)")
-            set_loader(args.ns, "off", ifname)  # Ensure eBPF loader is disabled
-            
-            for rep in range(1, args.runs_per_level+1):
-                random.shuffle(urls)  # Randomize URL order to minimize ordering effects
-                for url in tqdm(urls, desc=f"baseline {rep}/{args.runs_per_level}"):
-                    # Create unique tag for this measurement
-                    tag = f"off_rep{rep}_{url.replace('://','_').replace('/','_')}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}"
-                    
-                    # Perform measurement and save results
-                    pcap, nav = capture_one(args.ns, url, tag, args.headless, chrome)
-                    w.writerow({"mode":"off","level":0,"url":url,"rep":rep,"pcap":pcap,
-                                "plt_ms":nav["plt_ms"],"t_wall_start":nav["t_wall_start"],"t_wall_end":nav["t_wall_end"],
-                                "dyn_max_prob":"","dyn_min_pps":"","dyn_max_pps":""}); f.flush()
-
-        elif args.mode == "fixed":
-            """
-            Fixed Mode: Constant packet drop rates
-            
-            Tests specific drop percentages to understand the relationship between
-            packet loss and web performance. Each level is tested multiple times
-            for statistical significance.
-            """
-            levels = [int(x) for x in args.levels.split(",") if x.strip()]
-            
-            for lvl in levels:
-                print(f"[INFO] Starting fixed mode measurements at level {lvl}%")
+        # Rows are written once per repetition (and on the way out if interrupted),
+        # so no file I/O happens between navigations
+        rows = []
+        def flush_rows():
+            check_pcaps(rows)
+            w.writerows(rows); rows.clear(); f.flush()
+
+        try:
+            # Execute measurements: every plan gets its loader configuration and
+            # runs-per-level shuffled passes over the URL list
+            for plan, orders in zip(plans, url_orders):
+                print(f"[INFO] Starting {plan.title} measurements (mode: {plan.row['mode']})")
                 
-                # Configure eBPF loader for this drop rate
-                set_loader(args.ns, "fixed", ifname, fixed_prob=lvl)
+                # Configure (or disable) the eBPF loader for this plan (parallel shards run their own)
+                if not parallel:
+                    set_loader(args.ns, plan.loader_cmd)
                 
-                for rep in range(1, args.runs_per_level+1):
-                    random.shuffle(urls)  # Randomize URL order
-                    for url in tqdm(urls, desc=f"fixed {lvl}% rep {rep}/{args.runs_per_level}"):
-                        tag = f"lvl{lvl}_rep{rep}_{url.replace('://','_').replace('/','_')}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}"
-                        
-                        # Perform measurement and save results with drop level metadata
-                        pcap, nav = capture_one(args.ns, url, tag, args.headless, chrome)
-                        w.writerow({"mode":"fixed","level":lvl,"url":url,"rep":rep,"pcap":pcap,
-                                    "plt_ms":nav["plt_ms"],"t_wall_start":nav["t_wall_start"],"t_wall_end":nav["t_wall_end"],
-                                    "dyn_max_prob":"","dyn_min_pps":"","dyn_max_pps":""}); f.flush()
-            
-            # Disable eBPF loader after fixed mode measurements
-            set_loader(args.ns, "off", ifname)
-
-        else:  # dynamic mode
-            """
-            Dynamic Mode: Adaptive packet dropping
-            
-            Simulates realistic network conditions where packet loss varies based on
-            current traffic load. Higher traffic rates trigger higher drop rates,
-            mimicking network congestion scenarios.
-            """
-            # Configure eBPF loader for dynamic mode with specified parameters
-            set_loader(args.ns, "dynamic", ifname,
-                       dyn_max=args.dynamic_max_prob, 
-                       dyn_min_pps=args.dynamic_min_pps, 
-                       dyn_max_pps=args.dynamic_max_pps)
+                for rep, order in enumerate(orders, 1):
+                    desc = f"{plan.title} rep {rep}/{args.runs_per_level}"
+                    if parallel:
+                        # Deal the shuffled URLs round-robin, one shard per namespace; all shards of a
+                        # repetition finish before the next starts, so no namespace is used twice at once
+                        shards = [order[i::args.workers] for i in range(args.workers)]
+                        futures = [pool.submit(run_shard, ns, plan, rep, shard, chrome, args.headless)
+                                   for ns, shard in zip(namespaces, shards) if shard]
+                        for fut in tqdm(as_completed(futures), total=len(futures), desc=f"{desc} ({len(futures)} workers)"):
+                            fut.result()
+                        # Rows in the repetition's URL order, as in sequential runs, not completion
+                        # order: URL k of the order is entry k // workers of shard k % workers
+                        shard_rows = [fut.result() for fut in futures]
+                        rows.extend(shard_rows[k % args.workers][k // args.workers] for k in range(len(order)))
+                    else:
+                        for url in tqdm(order, desc=desc):
+                            rows.append(measure_url(args.ns, plan, rep, url, drv))
+                    flush_rows()
             
-            for rep in range(1, args.runs_per_level+1):
-                random.shuffle(urls)  # Randomize URL order
-                for url in tqdm(urls, desc=f"dynamic rep {rep}/{args.runs_per_level}"):
-                    tag = f"dyn_rep{rep}_{url.replace('://','_').replace('/','_')}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}"
-                    
-                    # Perform measurement and save results with dynamic mode metadata
-                    pcap, nav = capture_one(args.ns, url, tag, args.headless, chrome)
-                    w.writerow({"mode":"dynamic","level":-1,"url":url,"rep":rep,"pcap":pcap,
-                                "plt_ms":nav["plt_ms"],"t_wall_start":nav["t_wall_start"],"t_wall_end":nav["t_wall_end"],
-                                "dyn_max_prob":args.dynamic_max_prob,"dyn_min_pps":args.dynamic_min_pps,"dyn_max_pps":args.dynamic_max_pps}); f.flush()
-            
-            # Disable eBPF loader after dynamic mode measurements
-            set_loader(args.ns, "off", ifname)
+            # Disable eBPF loader after the measurements
+            set_loader(args.ns, ())
+        finally:
+            flush_rows()
 
 if __name__ == "__main__":
     main()